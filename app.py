@@ -3,32 +3,61 @@ Aplicación Flask para VaR RV
 Interfaz web para calcular Value at Risk por simulación histórica
 """
 
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, jsonify
 from models.supabase_client import supabase
-from models.var_calculator import VaRCalculator
+from models import async_supabase_client
+from models.market_snapshot import SnapshotCache
+from models.var_calculator import VaRCalculator, parse_fecha
+from models import results_store
 import config
 
 app = Flask(__name__)
 app.config['DEBUG'] = config.DEBUG
 
-# Inicializar calculador
+# Inicializar calculador, foto de datos compartida y resultados precalculados
+# (store es None si VAR_RESULTS_BACKEND no está configurado).
+# La foto (y su control de calidad) se carga una vez cada SNAPSHOT_TTL_SECONDS.
 calculator = VaRCalculator(supabase)
+snapshots = SnapshotCache()
+store = results_store.get_results_store()
+
+
+def parse_confianza(value):
+    """
+    Parsea el nivel de confianza del formulario o query string
+
+    Returns:
+        float: Confianza en (0, 1) (default 0.95) o None si es inválida
+    """
+    try:
+        confidence = float(value or 0.95)
+    except ValueError:
+        return None
+    return confidence if 0 < confidence < 1 else None
+
+
+def get_var(fecha_in, activo, confidence, snapshot):
+    """
+    VaR precalculado si existe; si no, cálculo en vivo sobre la foto dada
+    
+    Returns:
+        tuple: (VaRResult, error_msg, fuente)
+    """
+    result = results_store.lookup(store, fecha_in, activo, confidence)
+    if result is not None:
+        return result, None, "precalculado"
+    
+    result, error = calculator.calculate_for_position(fecha_in, activo, confidence, snapshot=snapshot)
+    return result, error, "en vivo"
 
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     """Página principal con formulario de cálculo de VaR"""
     
-    # Obtener lista de activos disponibles
-    df_positions = supabase.get_positions()
-    assets = []
-    
-    if not df_positions.empty and "Nemonico" in df_positions.columns:
-        assets = sorted(df_positions["Nemonico"].dropna().unique().tolist())
-    else:
-        df_prices = supabase.get_prices()
-        if not df_prices.empty and "Nemonico" in df_prices.columns:
-            assets = sorted(df_prices["Nemonico"].dropna().unique().tolist())
+    # Una sola foto por request para la lista de activos y el cálculo en vivo
+    snapshot = snapshots.get()
+    assets = snapshot.assets()
     
     result = None
     error = None
@@ -37,16 +66,18 @@ def index():
     if request.method == 'POST':
         fecha_in = request.form.get('fecha', '').strip()
         activo = request.form.get('activo', '').strip()
-        confidence = float(request.form.get('confianza') or 0.95)
+        confidence = parse_confianza(request.form.get('confianza'))
 
         # Validar entrada
         if not fecha_in:
             error = "Por favor ingrese una fecha (DD/MM/YYYY)"
         elif not activo:
             error = "Por favor seleccione un activo"
+        elif confidence is None:
+            error = "Nivel de confianza inválido (debe estar entre 0 y 1)"
         else:
-            # Calcular VaR
-            result, error = calculator.calculate_for_position(fecha_in, activo, confidence)
+            # Calcular VaR (precalculado primero)
+            result, error, _ = get_var(fecha_in, activo, confidence, snapshot)
             
             if error:
                 result = None
@@ -60,10 +91,31 @@ def health():
     return {'status': 'ok', 'service': 'var-rv'}, 200
 
 
+@app.route('/api/var', methods=['GET'])
+def api_var():
+    """API JSON de VaR: ?fecha=DD/MM/YYYY&activo=AAPL&confianza=0.95"""
+    fecha_in = request.args.get('fecha', '').strip()
+    activo = request.args.get('activo', '').strip()
+    confidence = parse_confianza(request.args.get('confianza'))
+    
+    if not fecha_in or not activo:
+        return jsonify({'error': 'Parámetros requeridos: fecha, activo'}), 400
+    if confidence is None:
+        return jsonify({'error': 'confianza debe ser un número entre 0 y 1'}), 400
+    if parse_fecha(fecha_in) is None:
+        return jsonify({'error': 'Formato de fecha inválido. Use DD/MM/YYYY o YYYY-MM-DD'}), 400
+    
+    result, error, fuente = get_var(fecha_in, activo, confidence, snapshots.get())
+    if error:
+        return jsonify({'error': error}), 404
+    
+    return jsonify(dict(result.to_dict(), fuente=fuente)), 200
+
+
 @app.route('/api/validate', methods=['GET'])
 def api_validate():
     """API para validar conexión a Supabase"""
-    validation = supabase.validate_connection()
+    validation = async_supabase_client.validate_connection(snapshots.current)
     return validation, 200 if validation['connected'] else 500
 
 
@@ -1,12 +1,161 @@
 """
 Script CLI para calcular VaR por línea de comandos
 Utiliza los modelos centralizados
+
+Si hay un worker activo (`python cli.py serve`), los pedidos se envían a él;
+si no, se calcula en el mismo proceso. Los imports pesados (pandas, numpy,
+clientes Supabase) se hacen solo cuando se calcula localmente.
 """
 
+import os
 import sys
 import argparse
-from models.supabase_client import supabase
-from models.var_calculator import VaRCalculator
+import config
+from models import daemon
+
+
+CSV_SIMULACIONES = "historical_var_simulations.csv"
+MAX_MENSAJES = 10  # errores de precompute mostrados por ejecución
+
+
+def print_validation(validation):
+    """Muestra el resultado de validate_connection"""
+    for msg in validation['messages']:
+        print(msg)
+
+    print("="*70)
+    if validation['connected'] and validation['positions_ok'] and validation['prices_ok']:
+        print("✅ VALIDACIÓN EXITOSA")
+    else:
+        print("❌ VALIDACIÓN FALLIDA")
+    print("="*70)
+
+
+def print_result(res):
+    """Muestra el resumen de un VaRResult (como dict, ver VaRResult.to_dict)"""
+    print(f"\n{'='*70}")
+    print(f"VaR - Simulación Histórica")
+    print(f"{'='*70}")
+    print(f"Activo: {res['activo']}")
+    print(f"Fecha de análisis: {res['fecha']}")
+    if res['fecha_posicion'] != res['fecha'] or res['fecha_precio'] != res['fecha']:
+        print(f"Posición al: {res['fecha_posicion']} | Precio base al: {res['fecha_precio']}")
+    print(f"Nominal (posición): {res['nominal']:.0f} unidades")
+    print(f"Confianza: {int(res['confidence']*100)}%")
+    print(f"Rango de precios: {res['fecha_min']} a {res['fecha_max']}")
+    print(f"Número de precios históricos: {res['num_precios']}")
+    print(f"Número de shocks: {res['num_shocks']}")
+    print(f"-"*70)
+    print(f"Precio base (última fecha): ${res['base_price']:.2f}")
+    print(f"MtM base: ${res['mtm_base']:.2f}")
+    print(f"VaR ({int(res['confidence']*100)}%): ${res['var']:.2f}")
+    print(f"Percentil de UP: ${res['percentile_value']:.2f}")
+    print(f"{'='*70}\n")
+
+
+def validate_local():
+    """Valida la conexión en el mismo proceso"""
+    from models import async_supabase_client
+    return async_supabase_client.validate_connection()
+
+
+def calculate_local(args, csv_path):
+    """
+    Calcula VaR en el mismo proceso
+
+    Returns:
+        tuple: (resultado_dict, error_msg)
+    """
+    from models.supabase_client import supabase
+    from models.market_snapshot import MarketSnapshot
+    from models.var_calculator import VaRCalculator
+
+    calculator = VaRCalculator(supabase)
+    snapshot = MarketSnapshot.from_async(max_staleness_days=args.max_antiguedad)
+    res, error = calculator.calculate_for_position(
+        args.fecha, args.activo, args.confianza, snapshot=snapshot
+    )
+    if error:
+        return None, error
+
+    res.simulaciones.to_csv(csv_path, index=False)
+    return res.to_dict(), None
+
+
+def run_precompute(args):
+    """Subcomando precompute: calcula y guarda VaR de fechas cerradas pendientes"""
+    from models.supabase_client import supabase
+    from models.market_snapshot import MarketSnapshot
+    from models.var_calculator import VaRCalculator
+    from models import results_store
+
+    backend = 'sqlite' if args.offline else (config.RESULTS_BACKEND or 'supabase')
+    store = results_store.get_results_store(backend)
+    calculator = VaRCalculator(supabase)
+    snapshot = MarketSnapshot.from_async(max_staleness_days=args.max_antiguedad)
+
+    if snapshot.empty:
+        print("❌ Error: No se pudieron obtener datos de Supabase")
+        sys.exit(1)
+
+    print(f"📊 Precalculando VaR ({backend})...")
+    try:
+        summary = results_store.precompute(
+            calculator, snapshot, store, confidence=args.confianza,
+            force=args.forzar, chunk_size=args.chunk
+        )
+    except RuntimeError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    for msg in summary['messages'][:MAX_MENSAJES]:
+        print(f"⚠️ {msg}")
+    if len(summary['messages']) > MAX_MENSAJES:
+        print(f"⚠️ ... y {len(summary['messages']) - MAX_MENSAJES} errores más (se reintentan en la próxima ejecución)")
+    print(f"✓ Calculados: {summary['computed']} | Ya guardados: {summary['skipped']} | "
+          f"Errores: {summary['errors']}")
+    if summary['failed_chunks']:
+        print(f"❌ {summary['failed_chunks']} bloques no pudieron guardarse")
+        sys.exit(1)
+
+
+def run_batch(args):
+    """Subcomando batch: calcula todos los pedidos de un archivo con una sola carga de datos"""
+    from models.supabase_client import supabase
+    from models.market_snapshot import MarketSnapshot
+    from models.var_calculator import VaRCalculator
+    from models import batch
+
+    calculator = VaRCalculator(supabase, dtype=args.dtype)
+    snapshot = MarketSnapshot.from_async(max_staleness_days=args.max_antiguedad)
+
+    if snapshot.empty:
+        print("❌ Error: No se pudieron obtener datos de Supabase")
+        sys.exit(1)
+
+    print(f"📊 Calculando VaR por lotes desde {args.input}...")
+    try:
+        summary = batch.run_batch(
+            calculator, snapshot, args.input, args.output,
+            scenarios_path=args.simulaciones, confidence=args.confianza, chunk_size=args.chunk
+        )
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    print(f"✓ Pedidos: {summary['requests']} | Exitosos: {summary['ok']} | Errores: {summary['errors']}")
+    print(f"✓ Resultados guardados en {args.output}")
+    if args.simulaciones:
+        print(f"✓ Simulaciones guardadas en {args.simulaciones}")
+
+
+def run_serve(args):
+    """Subcomando serve: inicia el worker persistente"""
+    try:
+        daemon.serve(args.socket)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
 
 
 def main():
@@ -17,59 +166,91 @@ def main():
     parser.add_argument('--fecha', type=str, help='Fecha de análisis (DD/MM/YYYY)', default=None)
     parser.add_argument('--activo', type=str, help='Código del activo', default='AAPL')
     parser.add_argument('--confianza', type=float, help='Nivel de confianza (0-1)', default=0.95)
-    
+    parser.add_argument('--max-antiguedad', type=int, help='Días máximos de antigüedad de posición/precio',
+                        default=config.MAX_STALENESS_DAYS)
+    parser.add_argument('--local', action='store_true', help='No usar el worker aunque esté activo')
+    parser.add_argument('--socket', type=str, help='Socket Unix del worker', default=config.DAEMON_SOCKET)
+
+    # Opciones de cálculo aceptadas también después del subcomando; SUPPRESS
+    # evita que el subcomando pise con su default el valor dado antes
+    calculo = argparse.ArgumentParser(add_help=False)
+    calculo.add_argument('--confianza', type=float, help='Nivel de confianza (0-1)', default=argparse.SUPPRESS)
+    calculo.add_argument('--max-antiguedad', type=int, help='Días máximos de antigüedad de posición/precio',
+                         default=argparse.SUPPRESS)
+
+    subparsers = parser.add_subparsers(dest='comando')
+    subparsers.add_parser('serve', help='Iniciar worker persistente con datos precargados')
+    precompute = subparsers.add_parser('precompute', parents=[calculo],
+                                       help='Precalcular VaR de fechas cerradas pendientes')
+    precompute.add_argument('--offline', action='store_true', help='Guardar en SQLite local en vez de Supabase')
+    precompute.add_argument('--forzar', action='store_true',
+                            help='Recalcular también lo ya guardado')
+    precompute.add_argument('--chunk', type=int, help='Registros por escritura', default=config.RESULTS_CHUNK_SIZE)
+
+    batch = subparsers.add_parser('batch', parents=[calculo],
+                                  help='Calcular VaR para pedidos de un archivo JSONL/CSV')
+    batch.add_argument('--input', required=True, help='Pedidos (.jsonl o .csv con fecha, activo, confianza)')
+    batch.add_argument('--output', required=True, help='Resumen por pedido (.jsonl, .csv o .parquet)')
+    batch.add_argument('--simulaciones', help='Escenarios de todos los pedidos en un solo archivo (opcional)',
+                       default=None)
+    batch.add_argument('--chunk', type=int, help='Pedidos por bloque', default=config.BATCH_CHUNK_SIZE)
+    batch.add_argument('--dtype', choices=['float64', 'float32'], help='Tipo de los shocks en memoria',
+                       default=config.RESULT_DTYPE)
+
     args = parser.parse_args()
-    
+
+    if args.comando == 'serve':
+        run_serve(args)
+        return
+    if args.comando == 'precompute':
+        run_precompute(args)
+        return
+    if args.comando == 'batch':
+        run_batch(args)
+        return
+
+    use_daemon = not args.local
+
     if args.validate:
         # Validar conexión
         print("="*70)
         print("VALIDACIÓN DE CONEXIÓN A SUPABASE")
         print("="*70)
-        
-        validation = supabase.validate_connection()
-        
-        for msg in validation['messages']:
-            print(msg)
-        
-        print("="*70)
-        if validation['connected'] and validation['positions_ok'] and validation['prices_ok']:
-            print("✅ VALIDACIÓN EXITOSA")
+
+        response = daemon.request({"op": "validate"}, path=args.socket) if use_daemon else None
+        if response is not None and response['ok']:
+            validation = response['validation']
         else:
-            print("❌ VALIDACIÓN FALLIDA")
-        print("="*70)
-        
+            validation = validate_local()
+
+        print_validation(validation)
+
     else:
         # Calcular VaR
         print(f"📊 Calculando VaR...")
-        
-        calculator = VaRCalculator(supabase)
-        res, error = calculator.calculate_for_position(args.fecha, args.activo, args.confianza)
-        
+
+        csv_path = os.path.abspath(CSV_SIMULACIONES)
+        payload = {
+            "op": "var",
+            "fecha": args.fecha,
+            "activo": args.activo,
+            "confianza": args.confianza,
+            "max_antiguedad": args.max_antiguedad,
+            "csv_path": csv_path
+        }
+        response = daemon.request(payload, path=args.socket) if use_daemon else None
+        if response is not None:
+            res, error = response.get('result'), response.get('error')
+        else:
+            res, error = calculate_local(args, csv_path)
+
         if error:
             print(f"❌ Error: {error}")
             sys.exit(1)
-        
+
         # Mostrar resultados
-        print(f"\n{'='*70}")
-        print(f"VaR - Simulación Histórica")
-        print(f"{'='*70}")
-        print(f"Activo: {res['activo']}")
-        print(f"Fecha de análisis: {res['fecha']}")
-        print(f"Nominal (posición): {res['nominal']:.0f} unidades")
-        print(f"Confianza: {int(res['confidence']*100)}%")
-        print(f"Rango de precios: {res['fecha_min']} a {res['fecha_max']}")
-        print(f"Número de precios históricos: {res['num_precios']}")
-        print(f"Número de shocks: {res['num_shocks']}")
-        print(f"-"*70)
-        print(f"Precio base (última fecha): ${res['base_price']:.2f}")
-        print(f"MtM base: ${res['mtm_base']:.2f}")
-        print(f"VaR ({int(res['confidence']*100)}%): ${res['var']:.2f}")
-        print(f"Percentil de UP: ${res['percentile_value']:.2f}")
-        print(f"{'='*70}\n")
-        
-        # Guardar simulaciones
-        res['simulaciones'].to_csv("historical_var_simulations.csv", index=False)
-        print("✓ Simulaciones guardadas en historical_var_simulations.csv")
+        print_result(res)
+        print(f"✓ Simulaciones guardadas en {CSV_SIMULACIONES}")
 
 
 if __name__ == '__main__':
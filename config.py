@@ -4,6 +4,7 @@ Variables de entorno y constantes globales
 """
 
 import os
+import tempfile
 
 # Supabase Configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL", "https://iqtvuzlmnnovhqhqedwd.supabase.co")
@@ -26,3 +27,44 @@ COLUMNS = {
     "nominal": "Nominal",
     "precio": "Precio"
 }
+
+# As-of lookups: días máximos de antigüedad para posición/precio
+MAX_STALENESS_DAYS = int(os.getenv("VAR_MAX_STALENESS_DAYS", 5))
+
+# Foto de datos compartida por proceso: segundos antes de recargar
+SNAPSHOT_TTL_SECONDS = int(os.getenv("VAR_SNAPSHOT_TTL_SECONDS", 300))
+
+# Control de calidad de precios
+QUALITY_OUTLIER_Z = float(os.getenv("VAR_QUALITY_OUTLIER_Z", 8.0))
+QUALITY_SPLIT_FACTORS = (2, 3, 4, 5, 10)
+QUALITY_SPLIT_TOLERANCE = 0.03
+QUALITY_DROP_SPLITS = os.getenv("VAR_QUALITY_DROP_SPLITS", "1") != "0"  # omitir saltos tipo split en el VaR
+QUALITY_MAX_SAMPLES = 10
+
+# Resultados: tipo de los shocks guardados ("float32" reduce memoria a la mitad)
+RESULT_DTYPE = os.getenv("VAR_RESULT_DTYPE", "float64")
+
+# Cliente asíncrono: consultas simultáneas máximas y timeout (segundos)
+ASYNC_MAX_CONCURRENCY = int(os.getenv("VAR_ASYNC_MAX_CONCURRENCY", 8))
+ASYNC_TIMEOUT = float(os.getenv("VAR_ASYNC_TIMEOUT", 30))
+
+# Worker persistente de cli.py (socket Unix local)
+# Ruta por usuario: en un /tmp compartido otro usuario podría ocupar un nombre fijo
+DAEMON_SOCKET = os.getenv("VAR_DAEMON_SOCKET", os.path.join(
+    os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir(),
+    f"var-rv-{os.getuid()}.sock" if hasattr(os, "getuid") else "var-rv.sock"
+))
+DAEMON_CONNECT_TIMEOUT = 0.5
+DAEMON_TIMEOUT = float(os.getenv("VAR_DAEMON_TIMEOUT", 120))
+DAEMON_REFRESH_SECONDS = int(os.getenv("VAR_DAEMON_REFRESH_SECONDS", 300))
+
+# Resultados precalculados: "supabase", "sqlite" (modo offline) o vacío para
+# no leerlos en la app (cli.py precompute usa Supabase por defecto)
+RESULTS_BACKEND = os.getenv("VAR_RESULTS_BACKEND", "")
+RESULTS_TABLE = "RV.VaR"
+RESULTS_SQLITE_PATH = os.getenv("VAR_RESULTS_SQLITE_PATH", "var_results.sqlite")
+RESULTS_CHUNK_SIZE = int(os.getenv("VAR_RESULTS_CHUNK_SIZE", 500))
+RESULTS_PAGE_SIZE = 1000  # filas por página al listar lo ya calculado
+
+# Modo batch de cli.py: pedidos por bloque
+BATCH_CHUNK_SIZE = int(os.getenv("VAR_BATCH_CHUNK_SIZE", 1000))
@@ -0,0 +1,24 @@
+"""
+Configuración de pytest: la raíz del repositorio queda en sys.path para importar config y models
+"""
+
+import pandas as pd
+import pytest
+from models.market_snapshot import MarketSnapshot
+
+
+@pytest.fixture
+def snapshot():
+    """Foto chica: 20 días hábiles de AAPL desde 2024-01-01 y una posición MSFT sin precios"""
+    fechas = pd.bdate_range("2024-01-01", periods=20)
+    prices = pd.DataFrame({
+        "Fecha": fechas.strftime("%Y-%m-%d"),
+        "Nemonico": "AAPL",
+        "Precio": [100 + (i % 5) - 2 * (i % 3) for i in range(20)]
+    })
+    positions = pd.DataFrame({
+        "Fecha": ["2024-01-10", "2024-01-26", "2024-01-02"],
+        "Nemonico": ["AAPL", "AAPL", "MSFT"],
+        "Nominal": [100, 150, 50]
+    })
+    return MarketSnapshot(positions, prices)
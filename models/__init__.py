@@ -4,5 +4,7 @@ Modelos y utilidades VaR RV
 
 __all__ = [
     "supabase_client",
+    "async_supabase_client",
+    "market_snapshot",
     "var_calculator"
 ]
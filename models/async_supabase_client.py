@@ -0,0 +1,221 @@
+"""
+Cliente asíncrono para Supabase
+Mismas lecturas que SupabaseClient, pero las consultas independientes se
+emiten en paralelo sobre un pool de conexiones httpx.
+
+Las funciones síncronas del módulo (fetch_tables, validate_connection)
+reutilizan un cliente por proceso que vive en un event loop propio en un
+hilo de fondo, de modo que las conexiones keep-alive se aprovechan entre
+llamadas y pueden usarse también desde código que ya corre un event loop.
+"""
+
+import asyncio
+import os
+import threading
+import httpx
+import pandas as pd
+from requests.utils import requote_uri
+from config import (
+    SUPABASE_API_URL,
+    SUPABASE_KEY,
+    TABLE_POSITIONS,
+    TABLE_PRICE,
+    ASYNC_MAX_CONCURRENCY,
+    ASYNC_TIMEOUT
+)
+from models.data_quality import check_prices
+from models.supabase_client import new_validation_result, table_info, validate_tables
+
+
+class AsyncSupabaseClient:
+    """
+    Cliente asíncrono para Supabase REST API
+
+    Debe usarse como context manager asíncrono: el pool de conexiones vive
+    mientras dure el bloque `async with`.
+
+        async with AsyncSupabaseClient() as client:
+            df_positions, df_prices = await client.get_tables()
+    """
+
+    def __init__(self, api_url=SUPABASE_API_URL, api_key=SUPABASE_KEY,
+                 max_concurrency=ASYNC_MAX_CONCURRENCY, timeout=ASYNC_TIMEOUT, transport=None):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.headers = {
+            "apikey": api_key,
+            "Authorization": f"Bearer {api_key}",
+            "Accept": "application/json",
+            "Content-Type": "application/json"
+        }
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.transport = transport  # httpx transport alternativo (p. ej. MockTransport en pruebas)
+        self._http = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        self._http = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            transport=self.transport,
+            limits=httpx.Limits(max_connections=self.max_concurrency,
+                                max_keepalive_connections=self.max_concurrency)
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._http.aclose()
+        self._http = None
+        self._semaphore = None
+
+    async def _get(self, table_name, params):
+        """GET acotado por el semáforo del cliente (params se codifican en la URL)"""
+        url = requote_uri(f"{self.api_url}/{table_name}")
+        async with self._semaphore:
+            return await self._http.get(url, params=params)
+
+    async def get_table_data(self, table_name, params=None):
+        """
+        Obtiene los datos de una tabla Supabase
+
+        Args:
+            table_name (str): Nombre de la tabla
+            params (dict): Parámetros PostgREST (default select=*)
+
+        Returns:
+            pd.DataFrame: DataFrame con los datos o DataFrame vacío si falla
+        """
+        try:
+            response = await self._get(table_name, params or {"select": "*"})
+            if response.status_code == 200:
+                data = response.json()
+                if not data:
+                    return pd.DataFrame()
+                return pd.DataFrame(data)
+            else:
+                print(f"Error HTTP al leer {table_name}: {response.status_code}")
+                print(response.text)
+                return pd.DataFrame()
+        except Exception as e:
+            print(f"Excepción al conectar a Supabase: {e}")
+            return pd.DataFrame()
+
+    async def get_positions(self):
+        """Obtiene datos de posiciones"""
+        return await self.get_table_data(TABLE_POSITIONS)
+
+    async def get_prices(self):
+        """Obtiene datos de precios"""
+        return await self.get_table_data(TABLE_PRICE)
+
+    async def get_tables(self):
+        """
+        Obtiene posiciones y precios en paralelo
+
+        Returns:
+            tuple: (df_positions, df_prices)
+        """
+        return tuple(await asyncio.gather(self.get_positions(), self.get_prices()))
+
+    async def _check_connection(self):
+        """Prueba de conexión: (ok, mensaje)"""
+        try:
+            response = await self._get(TABLE_PRICE, {"limit": 1})
+            if response.status_code == 200:
+                return True, "✅ Conexión a Supabase exitosa"
+            return False, f"❌ Error HTTP: {response.status_code}"
+        except Exception as e:
+            return False, f"❌ Error de conexión: {e}"
+
+    async def validate_connection(self, snapshot=None):
+        """
+        Valida la conexión y las tablas con las consultas en paralelo
+
+        Args:
+            snapshot (MarketSnapshot): Foto ya cargada; si se entrega, solo se
+                prueba la conexión y el estado de tablas y calidad sale de la foto
+
+        Returns:
+            dict: Resultado de validación con estado y detalles
+        """
+        result = new_validation_result()
+
+        if snapshot is not None:
+            connected, msg = await self._check_connection()
+            positions_info, prices_info = snapshot.positions_info, snapshot.prices_info
+            report = snapshot.quality_report
+        else:
+            (connected, msg), df_positions, df_prices = await asyncio.gather(
+                self._check_connection(), self.get_positions(), self.get_prices()
+            )
+            positions_info, prices_info = table_info(df_positions), table_info(df_prices)
+            report = check_prices(df_prices)[1] if prices_info is not None else None
+
+        result["connected"] = connected
+        result["messages"].append(msg)
+        if not connected:
+            return result
+
+        return validate_tables(result, positions_info, prices_info, report)
+
+
+_runner_lock = threading.Lock()
+_runner = None  # (pid, loop) del event loop de fondo de este proceso
+_clients = {}   # (api_url, api_key) -> AsyncSupabaseClient abierto; solo se usa desde el loop
+
+
+def _background_loop():
+    """Event loop de fondo del proceso (se recrea tras un fork)"""
+    global _runner
+    with _runner_lock:
+        if _runner is None or _runner[0] != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="supabase-async", daemon=True).start()
+            _runner = (os.getpid(), loop)
+            _clients.clear()
+        return _runner[1]
+
+
+async def _shared_client(api_url, api_key):
+    """Cliente de larga vida por credenciales, abierto en el loop de fondo"""
+    key = (api_url, api_key)
+    if key not in _clients:
+        client = AsyncSupabaseClient(api_url, api_key)
+        await client.__aenter__()
+        _clients[key] = client
+    return _clients[key]
+
+
+def run_with_client(func, *args, api_url=SUPABASE_API_URL, api_key=SUPABASE_KEY, **kwargs):
+    """
+    Ejecuta func(client, ...) con el cliente compartido desde código síncrono
+
+    La corrutina corre en el loop de fondo, así que la llamada funciona
+    aunque el hilo que llama ya tenga un event loop activo (lo bloquea
+    hasta terminar). No debe llamarse desde corrutinas del propio loop de fondo.
+
+    Args:
+        func: Corrutina que recibe un AsyncSupabaseClient como primer argumento
+        api_url (str): URL de la API REST
+        api_key (str): Clave de la API
+
+    Returns:
+        El valor retornado por func
+    """
+    async def _main():
+        client = await _shared_client(api_url, api_key)
+        return await func(client, *args, **kwargs)
+
+    return asyncio.run_coroutine_threadsafe(_main(), _background_loop()).result()
+
+
+def fetch_tables(api_url=SUPABASE_API_URL, api_key=SUPABASE_KEY):
+    """Descarga posiciones y precios en paralelo (API síncrona)"""
+    return run_with_client(AsyncSupabaseClient.get_tables, api_url=api_url, api_key=api_key)
+
+
+def validate_connection(snapshot=None):
+    """Valida la conexión con consultas en paralelo (API síncrona, ver AsyncSupabaseClient)"""
+    return run_with_client(AsyncSupabaseClient.validate_connection, snapshot)
@@ -0,0 +1,266 @@
+"""
+Cálculo de VaR por lotes
+Lee pedidos desde JSONL/CSV por bloques y escribe los resultados a medida
+que se calculan (JSONL, CSV o Parquet), con memoria acotada por bloque
+"""
+
+import csv
+import json
+import os
+import numpy as np
+from config import BATCH_CHUNK_SIZE
+
+
+SUMMARY_FIELDS = (
+    ("id", "string"),
+    ("fecha", "string"),
+    ("activo", "string"),
+    ("confianza", "float64"),
+    ("ok", "bool"),
+    ("error", "string"),
+    ("var", "float64"),
+    ("percentile_value", "float64"),
+    ("base_price", "float64"),
+    ("nominal", "float64"),
+    ("mtm_base", "float64"),
+    ("up", "float64"),
+    ("num_precios", "int64"),
+    ("num_shocks", "int64"),
+    ("fecha_posicion", "string"),
+    ("fecha_precio", "string"),
+    ("fecha_min", "string"),
+    ("fecha_max", "string")
+)
+
+SCENARIO_FIELDS = (
+    ("id", "string"),
+    ("activo", "string"),
+    ("fecha", "string"),
+    ("escenario", "int64"),
+    ("shock", "float64"),
+    ("precio_simulado", "float64"),
+    ("pnl", "float64")
+)
+
+
+def read_requests(path, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Lee pedidos de un archivo JSONL o CSV por bloques
+
+    Cada pedido tiene fecha, activo y opcionalmente confianza e id (si falta
+    el id se usa el número de línea).
+
+    Args:
+        path (str): Archivo .jsonl/.json o .csv
+        chunk_size (int): Pedidos por bloque
+
+    Yields:
+        list: Bloque de pedidos (dicts); las líneas inválidas traen la clave "error"
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in (".csv", ".jsonl", ".json", ".ndjson"):
+        raise ValueError(f"Formato de entrada no soportado: {ext} (use .jsonl o .csv)")
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = csv.DictReader(f) if ext == ".csv" else _jsonl_rows(f)
+
+        chunk = []
+        for num, row in enumerate(rows, start=1):
+            row.setdefault("id", str(num))
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _jsonl_rows(f):
+    """Filas de un archivo JSONL (ignora líneas vacías)"""
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = {"error": "Línea JSON inválida"}
+        yield row if isinstance(row, dict) else {"error": "Pedido JSON inválido"}
+
+
+class _JsonlWriter:
+    def __init__(self, path, fields):
+        self.fields = [name for name, _ in fields]
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps({k: row.get(k) for k in self.fields}, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class _CsvWriter:
+    def __init__(self, path, fields):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=[name for name, _ in fields],
+                                     extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    """Un row group por bloque; requiere pyarrow"""
+
+    def __init__(self, path, fields):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("La salida Parquet requiere pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.schema = pa.schema([(name, pa.type_for_alias(tipo)) for name, tipo in fields])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        if isinstance(rows, dict):
+            table = self.pa.table(rows, schema=self.schema)
+        else:
+            table = self.pa.Table.from_pylist(list(rows), schema=self.schema)
+        if table.num_rows:
+            self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+
+
+def open_writer(path, fields):
+    """
+    Escritor incremental según la extensión del archivo
+
+    Args:
+        path (str): Archivo .jsonl, .csv o .parquet
+        fields (tuple): Columnas (nombre, tipo)
+
+    Returns:
+        Objeto con write(rows) y close()
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return _JsonlWriter(path, fields)
+    if ext == ".csv":
+        return _CsvWriter(path, fields)
+    if ext == ".parquet":
+        return _ParquetWriter(path, fields)
+    raise ValueError(f"Formato de salida no soportado: {ext} (use .jsonl, .csv o .parquet)")
+
+
+def _columns(rows, fields):
+    """Convierte filas de escenarios (dicts de arreglos) en columnas concatenadas"""
+    return {name: np.concatenate([r[name] for r in rows]) if rows else [] for name, _ in fields}
+
+
+def _text(value):
+    """Valor como texto (None se conserva) para columnas string del esquema"""
+    return None if value is None else str(value)
+
+
+def _summary_row(pedido, confianza, res=None, error=None):
+    row = {name: None for name, _ in SUMMARY_FIELDS}
+    row.update(id=_text(pedido.get("id")), fecha=_text(pedido.get("fecha")),
+               activo=_text(pedido.get("activo")), confianza=confianza, ok=error is None,
+               error=_text(error))
+    if res is not None:
+        data = res.to_dict()
+        row.update({k: data[k] for k in row if k in data and k not in ("fecha", "activo")})
+    return row
+
+
+def _scenario_rows(pedido, res):
+    n = res.num_shocks
+    return {
+        "id": np.full(n, _text(pedido.get("id")), dtype=object),
+        "activo": np.full(n, res.activo, dtype=object),
+        "fecha": np.full(n, res.fecha, dtype=object),
+        "escenario": np.arange(n, dtype=np.int64),
+        "shock": res.shocks.astype(np.float64),
+        "precio_simulado": res.simulated_prices,
+        "pnl": res.pnl
+    }
+
+
+def run_batch(calculator, snapshot, input_path, output_path, scenarios_path=None,
+              confidence=0.95, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Calcula VaR para todos los pedidos del archivo de entrada
+
+    Los datos se cargan una sola vez (snapshot); cada bloque de pedidos se
+    calcula, se escribe y se descarta antes de leer el siguiente.
+
+    Args:
+        calculator (VaRCalculator): Calculador a usar
+        snapshot (MarketSnapshot): Foto de posiciones y precios
+        input_path (str): Pedidos (.jsonl o .csv)
+        output_path (str): Resumen por pedido (.jsonl, .csv o .parquet)
+        scenarios_path (str): Escenarios de todos los pedidos en un solo archivo (opcional)
+        confidence (float): Confianza por defecto si el pedido no la trae
+        chunk_size (int): Pedidos por bloque
+
+    Returns:
+        dict: Conteo de pedidos, exitosos y con error
+    """
+    summary = {"requests": 0, "ok": 0, "errors": 0}
+    writer = open_writer(output_path, SUMMARY_FIELDS)
+    scenarios = open_writer(scenarios_path, SCENARIO_FIELDS) if scenarios_path else None
+    try:
+        for chunk in read_requests(input_path, chunk_size):
+            rows, escenarios = [], []
+            for pedido in chunk:
+                error = pedido.get("error")
+                fecha, activo = pedido.get("fecha"), pedido.get("activo")
+                if error is None and not (isinstance(fecha, str) and isinstance(activo, str)):
+                    error = "fecha y activo son requeridos como texto"
+                confianza = pedido.get("confianza")
+                try:
+                    # Solo un valor ausente toma el default; 0 se valida como cualquier otro
+                    confianza = float(confidence if confianza in (None, "") else confianza)
+                    if not 0 < confianza < 1:
+                        raise ValueError(confianza)
+                except (TypeError, ValueError):
+                    confianza, error = None, error or "Confianza inválida"
+
+                res = None
+                if error is None:
+                    res, error = calculator.calculate_for_position(
+                        fecha, activo, confianza, snapshot=snapshot
+                    )
+                rows.append(_summary_row(pedido, confianza, res, error))
+                if res is not None and scenarios is not None:
+                    escenarios.append(_scenario_rows(pedido, res))
+
+            writer.write(rows)
+            if scenarios is not None and escenarios:
+                columnas = _columns(escenarios, SCENARIO_FIELDS)
+                if isinstance(scenarios, _ParquetWriter):
+                    scenarios.write(columnas)
+                else:
+                    listas = [columna.tolist() for columna in columnas.values()]
+                    scenarios.write(dict(zip(columnas, valores)) for valores in zip(*listas))
+
+            summary["requests"] += len(rows)
+            summary["ok"] += sum(1 for r in rows if r["ok"])
+            summary["errors"] += sum(1 for r in rows if not r["ok"])
+    finally:
+        writer.close()
+        if scenarios is not None:
+            scenarios.close()
+
+    return summary
@@ -0,0 +1,184 @@
+"""
+Worker persistente para cli.py
+Mantiene imports y datos cargados y atiende pedidos por un socket Unix local.
+
+Protocolo: una línea JSON por pedido y una línea JSON por respuesta.
+Este módulo solo importa la librería estándar; pandas/numpy y los clientes
+Supabase se cargan al iniciar el servidor.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import stat
+from config import DAEMON_SOCKET, DAEMON_CONNECT_TIMEOUT, DAEMON_TIMEOUT, DAEMON_REFRESH_SECONDS
+
+
+def available():
+    """True si la plataforma soporta sockets Unix"""
+    return hasattr(socket, "AF_UNIX")
+
+
+def _own_socket(path):
+    """True si path es un socket (no un enlace ni un archivo) del usuario actual"""
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(info.st_mode) and info.st_uid == os.getuid()
+
+
+def request(payload, path=DAEMON_SOCKET, timeout=DAEMON_TIMEOUT):
+    """
+    Envía un pedido al worker
+
+    Args:
+        payload (dict): Pedido, con al menos la clave "op"
+        path (str): Ruta del socket Unix
+        timeout (float): Segundos máximos de espera de la respuesta
+
+    Returns:
+        dict: Respuesta del worker o None si no hay worker escuchando, el
+            socket no es del usuario actual o el intercambio falla (el
+            llamador calcula en el propio proceso)
+    """
+    if not available() or not _own_socket(path):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(DAEMON_CONNECT_TIMEOUT)
+            sock.connect(path)
+            sock.settimeout(timeout)
+            with sock.makefile("rwb") as stream:
+                stream.write((json.dumps(payload) + "\n").encode("utf-8"))
+                stream.flush()
+                line = stream.readline()
+        response = json.loads(line) if line else None
+        return response if isinstance(response, dict) else None
+    except (OSError, ValueError):
+        # Sin worker, caído a mitad del pedido, timeout o respuesta ilegible
+        return None
+
+
+class VaRWorker:
+    """
+    Estado caliente del worker: calculador y foto de datos
+
+    La foto se recarga cuando supera DAEMON_REFRESH_SECONDS de antigüedad
+    o cuando se recibe el pedido "reload".
+    """
+
+    def __init__(self, refresh_seconds=DAEMON_REFRESH_SECONDS):
+        from models.supabase_client import supabase
+        from models.market_snapshot import SnapshotCache
+        from models.var_calculator import VaRCalculator
+
+        self.calculator = VaRCalculator(supabase)
+        self.snapshots = SnapshotCache(ttl_seconds=refresh_seconds)
+
+    def snapshot(self, force=False):
+        """Foto de datos vigente (la recarga si está vencida)"""
+        return self.snapshots.get(force=force)
+
+    def handle(self, payload):
+        """
+        Atiende un pedido
+
+        Operaciones: ping, reload, validate, var.
+
+        Returns:
+            dict: {"ok": bool, ...} serializable a JSON
+        """
+        op = payload.get("op")
+        try:
+            if op == "ping":
+                return {"ok": True, "pid": os.getpid()}
+            if op == "reload":
+                self.snapshot(force=True)
+                return {"ok": True}
+            if op == "validate":
+                from models import async_supabase_client
+                validation = async_supabase_client.validate_connection(self.snapshots.current)
+                return {"ok": True, "validation": validation}
+            if op == "var":
+                return self._var(payload)
+            return {"ok": False, "error": f"Operación desconocida: {op}"}
+        except Exception as e:
+            return {"ok": False, "error": f"Error en worker: {e}"}
+
+    def _var(self, payload):
+        """Calcula VaR y opcionalmente escribe el CSV de simulaciones"""
+        res, error = self.calculator.calculate_for_position(
+            payload.get("fecha"),
+            payload.get("activo"),
+            payload.get("confianza", 0.95),
+            snapshot=self.snapshot(),
+            max_staleness_days=payload.get("max_antiguedad")
+        )
+        if error:
+            return {"ok": False, "error": error}
+
+        csv_path = payload.get("csv_path")
+        if csv_path:
+            res.simulaciones.to_csv(csv_path, index=False)
+        return {"ok": True, "result": res.to_dict()}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Lee pedidos JSON línea a línea y responde en el mismo formato"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                payload = json.loads(line)
+            except ValueError:
+                response = {"ok": False, "error": "Pedido JSON inválido"}
+            else:
+                response = self.server.worker.handle(payload)
+            self.wfile.write((json.dumps(response, default=str) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+def serve(path=DAEMON_SOCKET):
+    """
+    Inicia el worker y atiende pedidos hasta Ctrl+C
+
+    Args:
+        path (str): Ruta del socket Unix
+
+    Raises:
+        RuntimeError: Si la plataforma no soporta sockets Unix, ya hay un worker
+            activo o la ruta está ocupada por algo que no es un socket propio
+    """
+    if not available():
+        raise RuntimeError("Sockets Unix no disponibles en esta plataforma")
+
+    if os.path.lexists(path):
+        if not _own_socket(path):
+            raise RuntimeError(f"{path} ya existe y no es un socket propio; use otra ruta con --socket")
+        if request({"op": "ping"}, path=path) is not None:
+            raise RuntimeError(f"Ya hay un worker escuchando en {path}")
+        os.unlink(path)  # socket huérfano de una ejecución anterior
+
+    worker = VaRWorker()
+    worker.snapshot()
+
+    # El socket nace con permisos 0600: sin ventana entre bind y chmod
+    old_umask = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+    finally:
+        os.umask(old_umask)
+    server.daemon_threads = True
+    server.worker = worker
+    print(f"✓ Worker VaR escuchando en {path} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if _own_socket(path):
+            os.unlink(path)
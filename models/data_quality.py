@@ -0,0 +1,167 @@
+"""
+Control de calidad de precios
+Limpieza vectorizada de RV.Price al cargar los datos (una vez por carga)
+"""
+
+import numpy as np
+import pandas as pd
+from config import (
+    COLUMNS,
+    QUALITY_OUTLIER_Z,
+    QUALITY_SPLIT_FACTORS,
+    QUALITY_SPLIT_TOLERANCE,
+    QUALITY_MAX_SAMPLES
+)
+
+
+FECHA = COLUMNS["fecha"]
+NEMONICO = COLUMNS["nemonico"]
+PRECIO = COLUMNS["precio"]
+
+
+def _samples(df, mask, extra_col=None):
+    """Lista corta (serializable a JSON) de filas marcadas para el reporte"""
+    rows = df.loc[mask].head(QUALITY_MAX_SAMPLES)
+    samples = []
+    for _, row in rows.iterrows():
+        sample = {
+            "nemonico": str(row[NEMONICO]),
+            "fecha": row[FECHA].strftime("%Y-%m-%d") if pd.notna(row[FECHA]) else None
+        }
+        if extra_col is not None:
+            sample[extra_col.lower()] = float(row[extra_col])
+        samples.append(sample)
+    return samples
+
+
+def flag_shocks(df, outlier_z=QUALITY_OUTLIER_Z, split_factors=QUALITY_SPLIT_FACTORS,
+                split_tolerance=QUALITY_SPLIT_TOLERANCE):
+    """
+    Marca saltos tipo split y shocks atípicos por activo
+
+    Un salto es "tipo split" si Precio_t / Precio_{t-1} está a menos de
+    split_tolerance de un factor de split (o su inverso). Un shock es atípico
+    si su z-score robusto (mediana/MAD del log-retorno del activo) supera
+    outlier_z.
+
+    Args:
+        df (pd.DataFrame): Precios limpios ordenados por (Nemonico, Fecha)
+
+    Returns:
+        pd.DataFrame: Copia con columnas Shock, Split y Outlier
+    """
+    df = df.copy()
+    grupos = df.groupby(NEMONICO, sort=False)[PRECIO]
+    shock = df[PRECIO] / grupos.shift(1)
+    df["Shock"] = shock
+
+    ratio = shock.to_numpy(dtype=float)
+    factores = np.asarray(split_factors, dtype=float)
+    factores = np.concatenate((factores, 1.0 / factores))
+    with np.errstate(invalid="ignore"):
+        distancia = np.abs(ratio[:, None] / factores[None, :] - 1.0)
+        split = np.where(np.isnan(distancia), np.inf, distancia).min(axis=1) < split_tolerance
+    df["Split"] = split
+
+    log_ret = pd.Series(np.log(ratio), index=df.index)
+    por_activo = log_ret.groupby(df[NEMONICO], sort=False)
+    mediana = por_activo.transform("median")
+    mad = (log_ret - mediana).abs().groupby(df[NEMONICO], sort=False).transform("median")
+    z = 0.6745 * (log_ret - mediana) / mad.where(mad > 0)
+    df["Outlier"] = (z.abs() > outlier_z).to_numpy() & ~split
+
+    return df
+
+
+def check_prices(df_prices):
+    """
+    Ejecuta el control de calidad sobre la tabla completa de precios
+
+    Pasos (todos operaciones agrupadas sobre la tabla entera):
+    fechas/precios no numéricos, precios cero o negativos, duplicados
+    (Nemonico, Fecha), huecos de calendario, saltos tipo split y shocks
+    atípicos. Los splits y atípicos se marcan pero no se eliminan; los
+    huecos solo se cuentan (las consultas as-of de MarketSnapshot usan el
+    último precio dentro de la antigüedad máxima).
+
+    Args:
+        df_prices (pd.DataFrame): Tabla RV.Price tal como llega de Supabase
+
+    Returns:
+        tuple: (df_limpio, reporte_dict)
+    """
+    report = {
+        "rows_in": 0,
+        "rows_out": 0,
+        "invalid": 0,
+        "duplicates": 0,
+        "non_positive": 0,
+        "gaps": 0,
+        "splits": 0,
+        "outliers": 0,
+        "samples": {},
+        "messages": []
+    }
+
+    if df_prices is None or df_prices.empty or not {FECHA, NEMONICO, PRECIO}.issubset(df_prices.columns):
+        report["messages"].append("⚠️ Sin precios para controlar calidad")
+        empty = pd.DataFrame(columns=[FECHA, NEMONICO, PRECIO, "Shock"])
+        empty["Split"] = pd.Series(dtype=bool)
+        empty["Outlier"] = pd.Series(dtype=bool)
+        return empty, report
+
+    report["rows_in"] = int(len(df_prices))
+    df = df_prices.copy()
+    df[FECHA] = pd.to_datetime(df[FECHA], errors="coerce")
+    df[PRECIO] = pd.to_numeric(df[PRECIO], errors="coerce")
+
+    # Fechas o precios no interpretables
+    invalid = df[[FECHA, NEMONICO, PRECIO]].isna().any(axis=1)
+    report["invalid"] = int(invalid.sum())
+    report["samples"]["invalid"] = _samples(df_prices.assign(**{FECHA: df[FECHA]}), invalid)
+    df = df.loc[~invalid]
+
+    # Precios cero o negativos (generan shocks infinitos o sin sentido)
+    non_positive = df[PRECIO] <= 0
+    report["non_positive"] = int(non_positive.sum())
+    report["samples"]["non_positive"] = _samples(df, non_positive, PRECIO)
+    df = df.loc[~non_positive]
+
+    # Duplicados por (Nemonico, Fecha): prevalece el último registro
+    df = df.sort_values([NEMONICO, FECHA], kind="mergesort")
+    duplicated = df.duplicated(subset=[NEMONICO, FECHA], keep="last")
+    report["duplicates"] = int(duplicated.sum())
+    report["samples"]["duplicates"] = _samples(df, duplicated, PRECIO)
+    df = df.loc[~duplicated]
+
+    # Huecos: fechas del calendario común sin precio dentro del rango de cada activo
+    if not df.empty:
+        calendario = np.sort(df[FECHA].unique())
+        rango = df.groupby(NEMONICO)[FECHA].agg(["min", "max", "size"])
+        pos_min = np.searchsorted(calendario, rango["min"].to_numpy(), side="left")
+        pos_max = np.searchsorted(calendario, rango["max"].to_numpy(), side="right")
+        report["gaps"] = int(((pos_max - pos_min) - rango["size"].to_numpy()).sum())
+
+    # Saltos tipo split y shocks atípicos
+    df = flag_shocks(df).reset_index(drop=True)
+    report["splits"] = int(df["Split"].sum())
+    report["outliers"] = int(df["Outlier"].sum())
+    report["samples"]["splits"] = _samples(df, df["Split"], "Shock")
+    report["samples"]["outliers"] = _samples(df, df["Outlier"], "Shock")
+    report["rows_out"] = int(len(df))
+
+    descartadas = report["invalid"] + report["duplicates"] + report["non_positive"]
+    report["messages"].append(
+        f"{'✅' if descartadas == 0 else '⚠️'} Calidad de precios: {report['rows_out']} de "
+        f"{report['rows_in']} registros válidos ({report['invalid']} inválidos, "
+        f"{report['duplicates']} duplicados, {report['non_positive']} precios <= 0)"
+    )
+    report["messages"].append(
+        f"{'✅' if report['gaps'] == 0 else '⚠️'} Calendario: {report['gaps']} huecos"
+    )
+    report["messages"].append(
+        f"{'✅' if report['splits'] + report['outliers'] == 0 else '⚠️'} Shocks: "
+        f"{report['splits']} saltos tipo split, {report['outliers']} atípicos"
+    )
+
+    return df, report
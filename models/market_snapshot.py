@@ -0,0 +1,238 @@
+"""
+Índice de posiciones y precios por fecha
+Permite consultas "as-of" (último dato en o antes de una fecha) en O(log n)
+"""
+
+import threading
+import time
+import numpy as np
+import pandas as pd
+from config import COLUMNS, MAX_STALENESS_DAYS, SNAPSHOT_TTL_SECONDS, QUALITY_DROP_SPLITS
+from models.data_quality import check_prices
+from models.supabase_client import table_info
+
+
+FECHA = COLUMNS["fecha"]
+NEMONICO = COLUMNS["nemonico"]
+NOMINAL = COLUMNS["nominal"]
+PRECIO = COLUMNS["precio"]
+
+
+def _to_datetime64(fecha):
+    """Convierte una fecha cualquiera a np.datetime64[ns]"""
+    return np.datetime64(pd.Timestamp(fecha), "ns")
+
+
+def _build_series(df, value_col):
+    """
+    Construye un diccionario {Nemonico: (fechas, valores)} ordenado por fecha
+
+    Args:
+        df (pd.DataFrame): Tabla con columnas Fecha, Nemonico y value_col
+        value_col (str): Columna de valores (Nominal o Precio)
+
+    Returns:
+        dict: Arreglos numpy de fechas (datetime64[ns]) y valores (float) por activo
+    """
+    if df is None or df.empty or not {FECHA, NEMONICO, value_col}.issubset(df.columns):
+        return {}
+
+    data = pd.DataFrame({
+        FECHA: pd.to_datetime(df[FECHA], errors="coerce"),
+        NEMONICO: df[NEMONICO],
+        value_col: pd.to_numeric(df[value_col], errors="coerce")
+    }).dropna()
+
+    # Una fila por (Nemonico, Fecha): prevalece el último registro
+    data = data.drop_duplicates(subset=[NEMONICO, FECHA], keep="last")
+    data = data.sort_values([NEMONICO, FECHA], kind="mergesort")
+
+    fechas = data[FECHA].to_numpy(dtype="datetime64[ns]")
+    valores = data[value_col].to_numpy(dtype=float)
+    nemonicos = data[NEMONICO].to_numpy()
+
+    # Cortes donde cambia el nemónico (datos ya ordenados)
+    cortes = np.flatnonzero(nemonicos[1:] != nemonicos[:-1]) + 1
+    inicios = np.concatenate(([0], cortes))
+    fines = np.concatenate((cortes, [len(nemonicos)]))
+
+    return {
+        nemonicos[i]: (fechas[i:j], valores[i:j])
+        for i, j in zip(inicios, fines)
+        if j > i
+    }
+
+
+class MarketSnapshot:
+    """
+    Foto de posiciones y precios indexada por activo y fecha
+
+    Cada activo guarda sus fechas ordenadas, de modo que las consultas
+    "último dato en o antes de fecha" se resuelven con np.searchsorted.
+    """
+
+    def __init__(self, df_positions, df_prices, max_staleness_days=MAX_STALENESS_DAYS, quality=True,
+                 drop_splits=QUALITY_DROP_SPLITS):
+        """
+        Args:
+            df_positions (pd.DataFrame): Tabla RV.Positions
+            df_prices (pd.DataFrame): Tabla RV.Price
+            max_staleness_days (int): Días máximos de antigüedad aceptados en consultas as-of
+            quality (bool): Ejecutar el control de calidad de precios al construir la foto
+            drop_splits (bool): Omitir en shock_history los saltos tipo split detectados
+        """
+        self.positions_info = table_info(df_positions)
+        self.prices_info = table_info(df_prices)
+        self.quality_report = None
+        self.splits = {}
+        if quality:
+            df_prices, self.quality_report = check_prices(df_prices)
+            # Mismas filas y orden que la serie de precios: marcas alineadas por índice
+            self.splits = _build_series(df_prices, "Split")
+        self.positions = _build_series(df_positions, NOMINAL)
+        self.prices = _build_series(df_prices, PRECIO)
+        self.max_staleness_days = max_staleness_days
+        self.drop_splits = drop_splits
+
+    @classmethod
+    def from_client(cls, supabase_client, **kwargs):
+        """Construye la foto descargando ambas tablas desde Supabase (en paralelo si el cliente lo permite)"""
+        if hasattr(supabase_client, "get_tables"):
+            return cls(*supabase_client.get_tables(), **kwargs)
+        return cls(supabase_client.get_positions(), supabase_client.get_prices(), **kwargs)
+
+    @classmethod
+    def from_async(cls, **kwargs):
+        """Construye la foto descargando ambas tablas en paralelo (cliente asíncrono)"""
+        from models.async_supabase_client import fetch_tables
+
+        df_positions, df_prices = fetch_tables()
+        return cls(df_positions, df_prices, **kwargs)
+
+    @property
+    def empty(self):
+        """True si no hay posiciones o no hay precios"""
+        return not self.positions or not self.prices
+
+    def assets(self):
+        """Activos disponibles: los del portafolio o, si no hay, los de precios"""
+        return sorted(self.positions or self.prices)
+
+    def _asof(self, series, activo, fecha, max_staleness_days):
+        """
+        Índice del último registro en o antes de fecha dentro de la serie del activo
+
+        Returns:
+            tuple: (fechas, valores, idx) o None si no hay dato válido
+        """
+        if activo not in series:
+            return None
+        fechas, valores = series[activo]
+        fecha64 = _to_datetime64(fecha)
+        idx = int(np.searchsorted(fechas, fecha64, side="right")) - 1
+        if idx < 0:
+            return None
+
+        if max_staleness_days is None:
+            max_staleness_days = self.max_staleness_days
+        if max_staleness_days is not None and fecha64 - fechas[idx] > np.timedelta64(max_staleness_days, "D"):
+            return None
+        return fechas, valores, idx
+
+    def position_asof(self, activo, fecha, max_staleness_days=None):
+        """
+        Última posición del activo en o antes de fecha
+
+        Returns:
+            tuple: (fecha_efectiva, nominal) o None si no hay posición vigente
+        """
+        found = self._asof(self.positions, activo, fecha, max_staleness_days)
+        if found is None:
+            return None
+        fechas, valores, idx = found
+        return pd.Timestamp(fechas[idx]), float(valores[idx])
+
+    def price_asof(self, activo, fecha, max_staleness_days=None):
+        """
+        Último precio del activo en o antes de fecha
+
+        Returns:
+            tuple: (fecha_efectiva, precio) o None si no hay precio vigente
+        """
+        found = self._asof(self.prices, activo, fecha, max_staleness_days)
+        if found is None:
+            return None
+        fechas, valores, idx = found
+        return pd.Timestamp(fechas[idx]), float(valores[idx])
+
+    def price_history(self, activo, fecha):
+        """
+        Serie de precios del activo hasta fecha (inclusive), ordenada cronológicamente
+
+        Returns:
+            tuple: (fechas, precios) como arreglos numpy (vacíos si no hay datos)
+        """
+        if activo not in self.prices:
+            return np.array([], dtype="datetime64[ns]"), np.array([], dtype=float)
+        fechas, valores = self.prices[activo]
+        end = int(np.searchsorted(fechas, _to_datetime64(fecha), side="right"))
+        return fechas[:end], valores[:end]
+
+    def shock_history(self, activo, fecha):
+        """
+        Shocks Precio_t / Precio_{t-1} del activo hasta fecha (inclusive)
+
+        Si la foto se construyó con drop_splits, se omiten los shocks marcados
+        como salto tipo split: un split 2:1 no es una pérdida del 50%.
+
+        Returns:
+            np.ndarray: Shocks en orden cronológico (vacío si hay menos de 2 precios)
+        """
+        _, precios = self.price_history(activo, fecha)
+        shocks = precios[1:] / precios[:-1]
+        if self.drop_splits and activo in self.splits:
+            es_split = self.splits[activo][1][1:len(precios)].astype(bool)
+            shocks = shocks[~es_split]
+        return shocks
+
+    def assets_on(self, fecha, max_staleness_days=None):
+        """Activos con posición vigente en fecha (as-of)"""
+        return sorted(
+            activo for activo in self.positions
+            if self.position_asof(activo, fecha, max_staleness_days) is not None
+        )
+
+
+class SnapshotCache:
+    """
+    Foto compartida por proceso, recargada cuando vence
+
+    Evita descargar y controlar los precios en cada request: la carga (y el
+    control de calidad) ocurre una vez cada ttl_seconds o al forzarla.
+    """
+
+    def __init__(self, loader=None, ttl_seconds=SNAPSHOT_TTL_SECONDS):
+        """
+        Args:
+            loader: Función sin argumentos que construye la foto (default: MarketSnapshot.from_async)
+            ttl_seconds (float): Segundos de vigencia de la foto
+        """
+        self.loader = loader or MarketSnapshot.from_async
+        self.ttl_seconds = ttl_seconds
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, force=False):
+        """Foto vigente (la recarga si está vencida, vacía o si force=True)"""
+        with self._lock:
+            vencida = time.monotonic() - self._loaded_at > self.ttl_seconds
+            if force or self._snapshot is None or self._snapshot.empty or vencida:
+                self._snapshot = self.loader()
+                self._loaded_at = time.monotonic()
+            return self._snapshot
+
+    @property
+    def current(self):
+        """Foto cargada actualmente, sin descargar (None si aún no hay)"""
+        return self._snapshot
@@ -0,0 +1,254 @@
+"""
+Resultados de VaR precalculados
+Almacenamiento en Supabase (RESULTS_TABLE) o en SQLite local, job de
+precálculo por lotes y lectura previa al cálculo en vivo
+"""
+
+import json
+import os
+import sqlite3
+import pandas as pd
+from config import (
+    RESULTS_BACKEND,
+    RESULTS_TABLE,
+    RESULTS_SQLITE_PATH,
+    RESULTS_CHUNK_SIZE,
+    RESULTS_PAGE_SIZE
+)
+from models.var_calculator import VaRResult, parse_fecha
+
+
+RESULT_KEY = ("Fecha", "Nemonico")
+RESULT_COLUMNS = (
+    "Fecha", "Nemonico", "FechaPosicion", "FechaPrecio", "Nominal", "PrecioBase",
+    "Confianza", "VaR", "Percentil", "NumPrecios", "FechaMin", "FechaMax", "Shocks", "Error"
+)
+
+
+def error_record(fecha, activo, error):
+    """
+    Fila para una posición que no se pudo calcular
+
+    Se guarda para consultar el motivo; computed_keys no la incluye, así que
+    se reintenta en cada ejecución y se reemplaza cuando se logra calcular.
+
+    Args:
+        fecha (pd.Timestamp): Fecha de la posición
+        activo (str): Código del activo
+        error (str): Motivo
+
+    Returns:
+        dict: Registro con todas las columnas de RESULT_COLUMNS
+    """
+    record = {c: None for c in RESULT_COLUMNS}
+    record.update(Fecha=fecha.strftime("%Y-%m-%d"), Nemonico=activo, Error=error)
+    return record
+
+
+class SupabaseResultsStore:
+    """Resultados precalculados en una tabla Supabase (clave Fecha, Nemonico)"""
+
+    def __init__(self, supabase_client, table_name=RESULTS_TABLE):
+        self.supabase = supabase_client
+        self.table_name = table_name
+
+    def computed_keys(self, page_size=RESULTS_PAGE_SIZE):
+        """
+        Conjunto de (Fecha ISO, Nemonico) calculados con éxito
+
+        Raises:
+            RuntimeError: Si alguna página no se puede leer (no se confunde con tabla vacía)
+        """
+        keys = set()
+        offset = 0
+        # PostgREST corta cada respuesta en max-rows: se pagina hasta una página vacía
+        while True:
+            df = self.supabase.get_table_data(self.table_name, {
+                "select": "Fecha,Nemonico",
+                "Error": "is.null",
+                "order": "Fecha,Nemonico",
+                "limit": page_size,
+                "offset": offset
+            }, raise_errors=True)
+            if df.empty:
+                return keys
+            keys.update(zip(df["Fecha"].astype(str).str[:10], df["Nemonico"]))
+            offset += len(df)
+
+    def get(self, fecha, activo):
+        """Registro precalculado o None"""
+        df = self.supabase.get_table_data(self.table_name, {
+            "select": "*",
+            "Fecha": f"eq.{fecha}",
+            "Nemonico": f"eq.{activo}",
+            "limit": 1
+        })
+        if df.empty:
+            return None
+        return df.iloc[0].to_dict()
+
+    def upsert(self, records):
+        """Inserta o actualiza un bloque de registros"""
+        return self.supabase.upsert_table_data(self.table_name, records, ",".join(RESULT_KEY))
+
+
+class SQLiteResultsStore:
+    """Resultados precalculados en un archivo SQLite local (modo offline)"""
+
+    def __init__(self, path=RESULTS_SQLITE_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS var_results ("
+                "Fecha TEXT NOT NULL, Nemonico TEXT NOT NULL, FechaPosicion TEXT, "
+                "FechaPrecio TEXT, Nominal REAL, PrecioBase REAL, Confianza REAL, "
+                "VaR REAL, Percentil REAL, NumPrecios INTEGER, FechaMin TEXT, "
+                "FechaMax TEXT, Shocks TEXT, Error TEXT, PRIMARY KEY (Fecha, Nemonico))"
+            )
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(var_results)")}
+            if "Error" not in columns:
+                conn.execute("ALTER TABLE var_results ADD COLUMN Error TEXT")
+
+    def _connect(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def computed_keys(self):
+        """Conjunto de (Fecha ISO, Nemonico) calculados con éxito"""
+        with self._connect() as conn:
+            return {(row["Fecha"], row["Nemonico"]) for row in conn.execute(
+                "SELECT Fecha, Nemonico FROM var_results WHERE Error IS NULL"
+            )}
+
+    def get(self, fecha, activo):
+        """Registro precalculado o None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM var_results WHERE Fecha = ? AND Nemonico = ?", (fecha, activo)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def upsert(self, records):
+        """Inserta o actualiza un bloque de registros en una sola transacción"""
+        placeholders = ", ".join("?" for _ in RESULT_COLUMNS)
+        rows = [
+            tuple(json.dumps(r[c]) if c == "Shocks" and r[c] is not None else r.get(c)
+                  for c in RESULT_COLUMNS)
+            for r in records
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO var_results ({', '.join(RESULT_COLUMNS)}) "
+                f"VALUES ({placeholders})",
+                rows
+            )
+        return True
+
+
+def get_results_store(backend=RESULTS_BACKEND, supabase_client=None):
+    """
+    Crea el almacenamiento de resultados configurado
+
+    Args:
+        backend (str): "supabase", "sqlite" o vacío (sin resultados precalculados)
+        supabase_client: Cliente a usar con backend "supabase" (default: instancia global)
+
+    Returns:
+        SupabaseResultsStore, SQLiteResultsStore o None
+
+    Raises:
+        ValueError: Si el backend no es reconocido
+    """
+    if not backend:
+        return None
+    if backend not in ("supabase", "sqlite"):
+        raise ValueError(f"Backend de resultados desconocido: {backend}")
+    if backend == "sqlite":
+        return SQLiteResultsStore()
+    if supabase_client is None:
+        from models.supabase_client import supabase as supabase_client
+    return SupabaseResultsStore(supabase_client)
+
+
+def lookup(store, fecha_analisis, activo, confidence=0.95):
+    """
+    Busca un resultado precalculado
+
+    Args:
+        store: Almacenamiento de resultados (None: sin precalculados)
+        fecha_analisis (str o datetime): Fecha de análisis (DD/MM/YYYY o datetime)
+        activo (str): Código del activo
+        confidence (float): Nivel de confianza pedido
+
+    Returns:
+        VaRResult o None si no está precalculado
+    """
+    if store is None:
+        return None
+    fecha_dt = parse_fecha(fecha_analisis)
+    if fecha_dt is None or not activo:
+        return None
+    record = store.get(fecha_dt.strftime("%Y-%m-%d"), activo)
+    if record is None or isinstance(record.get("Error"), str):
+        return None
+    return VaRResult.from_record(record, confidence=confidence)
+
+
+def precompute(calculator, snapshot, store, confidence=0.95, hasta=None, force=False,
+               chunk_size=RESULTS_CHUNK_SIZE):
+    """
+    Calcula VaR para todas las posiciones aún no calculadas y las guarda por bloques
+
+    Solo se consideran fechas cerradas (anteriores a hasta, por defecto hoy).
+    Las posiciones que no se pueden calcular se guardan con su error y se
+    reintentan en la ejecución siguiente (p. ej. si el precio aún no se
+    había sincronizado).
+
+    Args:
+        calculator (VaRCalculator): Calculador a usar
+        snapshot (MarketSnapshot): Foto de posiciones y precios
+        store: Almacenamiento de resultados
+        confidence (float): Nivel de confianza guardado
+        hasta (datetime): Fecha tope exclusiva (default: hoy)
+        force (bool): Recalcular también lo ya guardado
+        chunk_size (int): Registros por escritura
+
+    Returns:
+        dict: Conteo de calculados, omitidos, errores y bloques con escritura fallida,
+            más los mensajes de error
+
+    Raises:
+        RuntimeError: Si no se puede leer lo ya calculado (evita recalcular todo a ciegas)
+    """
+    hasta = pd.Timestamp.today().normalize() if hasta is None else pd.Timestamp(hasta)
+    done = set() if force else store.computed_keys()
+    summary = {"computed": 0, "skipped": 0, "errors": 0, "failed_chunks": 0, "messages": []}
+    chunk = []
+
+    def flush():
+        if chunk and not store.upsert(chunk):
+            summary["failed_chunks"] += 1
+        chunk.clear()
+
+    for activo, (fechas, _) in snapshot.positions.items():
+        for fecha in pd.DatetimeIndex(fechas[fechas < hasta.to_datetime64()]):
+            if (fecha.strftime("%Y-%m-%d"), activo) in done:
+                summary["skipped"] += 1
+                continue
+
+            res, error = calculator.calculate_for_position(fecha, activo, confidence, snapshot=snapshot)
+            if error:
+                summary["errors"] += 1
+                summary["messages"].append(f"{activo} {fecha.strftime('%d/%m/%Y')}: {error}")
+                chunk.append(error_record(fecha, activo, error))
+            else:
+                chunk.append(dict(res.to_record(), Error=None))
+                summary["computed"] += 1
+            if len(chunk) >= chunk_size:
+                flush()
+
+    flush()
+    return summary
@@ -1,11 +1,13 @@
 """
 Cliente para conexión con Supabase
-Maneja todas las operaciones de lectura hacia las tablas
+Maneja las operaciones de lectura hacia las tablas y la escritura de resultados
 """
 
 import requests
 import pandas as pd
+from requests.utils import requote_uri
 from config import SUPABASE_API_URL, SUPABASE_KEY, TABLE_POSITIONS, TABLE_PRICE, COLUMNS
+from models.data_quality import check_prices
 
 
 class SupabaseClient:
@@ -21,33 +23,68 @@ class SupabaseClient:
             "Content-Type": "application/json"
         }
     
-    def get_table_data(self, table_name):
+    def get_table_data(self, table_name, params=None, raise_errors=False):
         """
-        Obtiene todos los datos de una tabla Supabase
+        Obtiene los datos de una tabla Supabase
         
         Args:
             table_name (str): Nombre de la tabla
+            params (dict): Parámetros PostgREST, se codifican en la URL (default select=*)
+            raise_errors (bool): Lanzar RuntimeError si la lectura falla en vez de
+                devolver un DataFrame vacío (para distinguir falla de tabla vacía)
         
         Returns:
             pd.DataFrame: DataFrame con los datos o DataFrame vacío si falla
-        """
-        from requests.utils import requote_uri
         
-        url = requote_uri(f"{self.api_url}/{table_name}?select=*")
+        Raises:
+            RuntimeError: Si la lectura falla y raise_errors es True
+        """
+        url = requote_uri(f"{self.api_url}/{table_name}")
         try:
-            response = requests.get(url, headers=self.headers)
-            if response.status_code == 200:
-                data = response.json()
-                if not data:
-                    return pd.DataFrame()
-                return pd.DataFrame(data)
-            else:
-                print(f"Error HTTP al leer {table_name}: {response.status_code}")
-                print(response.text)
-                return pd.DataFrame()
+            response = requests.get(url, headers=self.headers, params=params or {"select": "*"})
         except Exception as e:
+            if raise_errors:
+                raise RuntimeError(f"Excepción al conectar a Supabase: {e}") from e
             print(f"Excepción al conectar a Supabase: {e}")
             return pd.DataFrame()
+        
+        if response.status_code != 200:
+            if raise_errors:
+                raise RuntimeError(f"Error HTTP al leer {table_name}: {response.status_code} {response.text}")
+            print(f"Error HTTP al leer {table_name}: {response.status_code}")
+            print(response.text)
+            return pd.DataFrame()
+        
+        data = response.json()
+        if not data:
+            return pd.DataFrame()
+        return pd.DataFrame(data)
+    
+    def upsert_table_data(self, table_name, records, on_conflict):
+        """
+        Inserta o actualiza registros en una tabla Supabase (un solo POST)
+        
+        Args:
+            table_name (str): Nombre de la tabla
+            records (list): Lista de dicts serializables a JSON
+            on_conflict (str): Columnas de la clave única separadas por coma
+        
+        Returns:
+            bool: True si la escritura fue aceptada
+        """
+        url = requote_uri(f"{self.api_url}/{table_name}")
+        headers = dict(self.headers, Prefer="resolution=merge-duplicates,return=minimal")
+        try:
+            response = requests.post(url, headers=headers, params={"on_conflict": on_conflict},
+                                     json=records)
+            if response.status_code in (200, 201, 204):
+                return True
+            print(f"Error HTTP al escribir {table_name}: {response.status_code}")
+            print(response.text)
+            return False
+        except Exception as e:
+            print(f"Excepción al conectar a Supabase: {e}")
+            return False
     
     def get_positions(self):
         """Obtiene datos de posiciones"""
@@ -57,6 +94,16 @@ class SupabaseClient:
         """Obtiene datos de precios"""
         return self.get_table_data(TABLE_PRICE)
     
+    def get_tables(self):
+        """
+        Obtiene posiciones y precios en paralelo (cliente asíncrono compartido)
+        
+        Returns:
+            tuple: (df_positions, df_prices)
+        """
+        from models.async_supabase_client import fetch_tables
+        return fetch_tables(self.api_url, self.api_key)
+    
     def validate_connection(self):
         """
         Valida la conexión a Supabase y la existencia de tablas
@@ -64,17 +111,12 @@ class SupabaseClient:
         Returns:
             dict: Resultado de validación con estado y detalles
         """
-        result = {
-            "connected": False,
-            "positions_ok": False,
-            "prices_ok": False,
-            "messages": []
-        }
+        result = new_validation_result()
         
         # Test connection
         try:
-            url = requote_uri(f"{self.api_url}/{TABLE_PRICE}?limit=1")
-            response = requests.get(url, headers=self.headers)
+            url = requote_uri(f"{self.api_url}/{TABLE_PRICE}")
+            response = requests.get(url, headers=self.headers, params={"limit": 1})
             if response.status_code == 200:
                 result["connected"] = True
                 result["messages"].append("✅ Conexión a Supabase exitosa")
@@ -88,26 +130,65 @@ class SupabaseClient:
         # Validate tables
         df_positions = self.get_positions()
         df_prices = self.get_prices()
+        report = check_prices(df_prices)[1] if not df_prices.empty else None
+        return validate_tables(result, table_info(df_positions), table_info(df_prices), report)
+
+
+def new_validation_result():
+    """Estructura vacía del resultado de validación"""
+    return {
+        "connected": False,
+        "positions_ok": False,
+        "prices_ok": False,
+        "quality": None,
+        "messages": []
+    }
+
+
+def table_info(df):
+    """Registros y columnas de una tabla descargada (None si vino vacía)"""
+    if df is None or df.empty:
+        return None
+    return {"rows": int(len(df)), "columns": df.columns.tolist()}
+
+
+def validate_tables(result, positions_info, prices_info, quality_report=None):
+    """
+    Completa el resultado de validación con el estado de ambas tablas
+    
+    Args:
+        result (dict): Resultado de validación (ver new_validation_result)
+        positions_info (dict): Registros y columnas de RV.Positions (ver table_info)
+        prices_info (dict): Registros y columnas de RV.Price (ver table_info)
+        quality_report (dict): Reporte de check_prices ya calculado (opcional)
+    
+    Returns:
+        dict: El mismo resultado, actualizado
+    """
+    if positions_info is not None:
+        result["positions_ok"] = True
+        result["messages"].append(
+            f"✅ Tabla {TABLE_POSITIONS}: {positions_info['rows']} registros, "
+            f"columnas: {positions_info['columns']}"
+        )
+    else:
+        result["messages"].append(f"❌ Error al leer tabla {TABLE_POSITIONS}")
+    
+    if prices_info is not None:
+        result["prices_ok"] = True
+        result["messages"].append(
+            f"✅ Tabla {TABLE_PRICE}: {prices_info['rows']} registros, "
+            f"columnas: {prices_info['columns']}"
+        )
         
-        if df_positions is not None and not df_positions.empty:
-            result["positions_ok"] = True
-            result["messages"].append(
-                f"✅ Tabla {TABLE_POSITIONS}: {len(df_positions)} registros, "
-                f"columnas: {df_positions.columns.tolist()}"
-            )
-        else:
-            result["messages"].append(f"❌ Error al leer tabla {TABLE_POSITIONS}")
-        
-        if df_prices is not None and not df_prices.empty:
-            result["prices_ok"] = True
-            result["messages"].append(
-                f"✅ Tabla {TABLE_PRICE}: {len(df_prices)} registros, "
-                f"columnas: {df_prices.columns.tolist()}"
-            )
-        else:
-            result["messages"].append(f"❌ Error al leer tabla {TABLE_PRICE}")
-        
-        return result
+        # Control de calidad de precios
+        if quality_report is not None:
+            result["quality"] = quality_report
+            result["messages"].extend(quality_report["messages"])
+    else:
+        result["messages"].append(f"❌ Error al leer tabla {TABLE_PRICE}")
+    
+    return result
 
 
 # Instancia global
@@ -2,8 +2,11 @@
 Calculadora de VaR por Simulación Histórica
 """
 
+import json
 import numpy as np
 import pandas as pd
+from models.market_snapshot import MarketSnapshot
+from config import RESULT_DTYPE
 
 
 def compute_historical_var(prices, nominal, confidence=0.95, base_price=None):
@@ -65,127 +68,352 @@ def compute_historical_var(prices, nominal, confidence=0.95, base_price=None):
     }
 
 
+def var_from_shocks(shocks, nominal, base_price, confidence=0.95):
+    """
+    Calcula VaR directamente desde los shocks, sin materializar precios ni P&L
+
+    Como UP = nominal * base_price * (shock - 1) es afín en el shock, su
+    percentil es el percentil de los shocks transformado (el extremo opuesto
+    si la posición es corta). Equivale a compute_historical_var.
+
+    Args:
+        shocks (np.ndarray): Shocks Precio_t / Precio_{t-1}
+        nominal (float): Cantidad del instrumento
+        base_price (float): Precio base
+        confidence (float): Nivel de confianza (e.g. 0.95 para VaR 95%)
+
+    Returns:
+        tuple: (var, percentile_value, tail_pct)
+    """
+    tail_pct = (1 - confidence) * 100
+    exposure = nominal * base_price
+    q = tail_pct if exposure >= 0 else 100 - tail_pct
+    pct_value = float(exposure * (np.percentile(shocks, q) - 1))
+    return -pct_value, pct_value, tail_pct
+
+
+class VaRResult:
+    """
+    Resultado compacto de VaR para una posición
+
+    Solo guarda los shocks (opcionalmente en float32) y los escalares del
+    cálculo. Los precios simulados, el MtM simulado y el P&L se derivan al
+    acceder, y el DataFrame de simulaciones se construye solo cuando se pide
+    (plantilla o exportación CSV).
+    """
+
+    __slots__ = (
+        "activo", "fecha", "fecha_posicion", "fecha_precio", "nominal",
+        "confidence", "base_price", "var", "percentile_value", "tail_pct",
+        "num_precios", "fecha_min", "fecha_max", "shocks"
+    )
+
+    # Claves accesibles como res['...'] (campos y métricas derivadas)
+    _ITEM_KEYS = __slots__ + (
+        "fecha_analisis", "num_shocks", "mtm_base", "simulated_prices",
+        "mtm_sim", "pnl", "up", "simulaciones"
+    )
+
+    def __init__(self, activo, fecha, fecha_posicion, fecha_precio, nominal, confidence,
+                 base_price, var, percentile_value, tail_pct, num_precios, fecha_min,
+                 fecha_max, shocks, dtype=np.float64):
+        self.activo = activo
+        self.fecha = fecha
+        self.fecha_posicion = fecha_posicion
+        self.fecha_precio = fecha_precio
+        self.nominal = float(nominal)
+        self.confidence = confidence
+        self.base_price = float(base_price)
+        self.var = float(var)
+        self.percentile_value = float(percentile_value)
+        self.tail_pct = tail_pct
+        self.num_precios = num_precios
+        self.fecha_min = fecha_min
+        self.fecha_max = fecha_max
+        self.shocks = np.asarray(shocks, dtype=dtype)
+
+    @property
+    def fecha_analisis(self):
+        """Alias de fecha (nombre usado por la plantilla)"""
+        return self.fecha
+
+    @property
+    def num_shocks(self):
+        return len(self.shocks)
+
+    @property
+    def mtm_base(self):
+        return self.nominal * self.base_price
+
+    @property
+    def simulated_prices(self):
+        """Precios simulados: shock aplicado al precio base"""
+        return self.base_price * self.shocks.astype(np.float64)
+
+    @property
+    def mtm_sim(self):
+        return self.nominal * self.simulated_prices
+
+    @property
+    def pnl(self):
+        """UP = P&L = MtM simulado - MtM base"""
+        return self.mtm_sim - self.mtm_base
+
+    @property
+    def up(self):
+        """Máxima ganancia posible"""
+        if not len(self.shocks):
+            return 0.0
+        best = np.max(self.shocks) if self.mtm_base >= 0 else np.min(self.shocks)
+        return float(self.mtm_base * (best - 1))
+
+    @property
+    def simulaciones(self):
+        """DataFrame con los escenarios (nombres esperados por el template)"""
+        return pd.DataFrame({
+            "Shock": self.shocks,
+            "Precio Simulado": self.simulated_prices,
+            "P&L Simulado": self.pnl
+        })
+
+    def __getitem__(self, key):
+        """Acceso tipo dict, compatible con el resultado anterior"""
+        if key not in self._ITEM_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self, include_simulaciones=False):
+        """
+        Resumen serializable (sin arreglos salvo que se pidan las simulaciones)
+
+        Args:
+            include_simulaciones (bool): Incluir el DataFrame de simulaciones
+
+        Returns:
+            dict: Metadatos y métricas del resultado
+        """
+        data = {
+            "activo": self.activo,
+            "fecha": self.fecha,
+            "fecha_analisis": self.fecha_analisis,
+            "fecha_posicion": self.fecha_posicion,
+            "fecha_precio": self.fecha_precio,
+            "nominal": self.nominal,
+            "confidence": self.confidence,
+            "base_price": self.base_price,
+            "mtm_base": self.mtm_base,
+            "var": self.var,
+            "up": self.up,
+            "percentile_value": self.percentile_value,
+            "tail_pct": self.tail_pct,
+            "num_precios": self.num_precios,
+            "num_shocks": self.num_shocks,
+            "fecha_min": self.fecha_min,
+            "fecha_max": self.fecha_max
+        }
+        if include_simulaciones:
+            data["simulaciones"] = self.simulaciones
+        return data
+
+    def set_confidence(self, confidence):
+        """Recalcula VaR y percentil para otro nivel de confianza usando los shocks guardados"""
+        self.confidence = confidence
+        self.var, self.percentile_value, self.tail_pct = var_from_shocks(
+            self.shocks, self.nominal, self.base_price, confidence
+        )
+
+    def to_record(self):
+        """
+        Fila para la tabla de resultados precalculados (RESULTS_TABLE)
+
+        Returns:
+            dict: Registro serializable a JSON, con fechas ISO y shocks como lista
+        """
+        def iso(fecha):
+            return pd.to_datetime(fecha, format="%d/%m/%Y").strftime("%Y-%m-%d")
+
+        return {
+            "Fecha": iso(self.fecha),
+            "Nemonico": self.activo,
+            "FechaPosicion": iso(self.fecha_posicion),
+            "FechaPrecio": iso(self.fecha_precio),
+            "Nominal": self.nominal,
+            "PrecioBase": self.base_price,
+            "Confianza": self.confidence,
+            "VaR": self.var,
+            "Percentil": self.percentile_value,
+            "NumPrecios": int(self.num_precios),
+            "FechaMin": iso(self.fecha_min),
+            "FechaMax": iso(self.fecha_max),
+            "Shocks": self.shocks.astype(np.float64).tolist()
+        }
+
+    @classmethod
+    def from_record(cls, record, confidence=None, dtype=np.float64):
+        """
+        Reconstruye el resultado desde una fila de resultados precalculados
+
+        Args:
+            record (dict): Fila generada por to_record
+            confidence (float): Nivel de confianza pedido (si difiere, se recalcula)
+            dtype: Tipo de los shocks
+
+        Returns:
+            VaRResult
+        """
+        def local(fecha):
+            return pd.to_datetime(fecha).strftime("%d/%m/%Y")
+
+        shocks = record["Shocks"]
+        if isinstance(shocks, str):
+            shocks = json.loads(shocks)
+
+        res = cls(
+            activo=record["Nemonico"],
+            fecha=local(record["Fecha"]),
+            fecha_posicion=local(record["FechaPosicion"]),
+            fecha_precio=local(record["FechaPrecio"]),
+            nominal=record["Nominal"],
+            confidence=float(record["Confianza"]),
+            base_price=record["PrecioBase"],
+            var=record["VaR"],
+            percentile_value=record["Percentil"],
+            tail_pct=(1 - float(record["Confianza"])) * 100,
+            num_precios=int(record["NumPrecios"]),
+            fecha_min=local(record["FechaMin"]),
+            fecha_max=local(record["FechaMax"]),
+            shocks=shocks,
+            dtype=dtype
+        )
+        if confidence is not None and not np.isclose(confidence, res.confidence):
+            res.set_confidence(confidence)
+        return res
+
+
+def parse_fecha(fecha_analisis):
+    """
+    Parsea la fecha de análisis
+
+    Args:
+        fecha_analisis (str o datetime): Fecha (DD/MM/YYYY, YYYY-MM-DD o datetime)
+
+    Returns:
+        pd.Timestamp: Fecha parseada o None si el formato es inválido
+    """
+    if isinstance(fecha_analisis, str):
+        try:
+            return pd.to_datetime(fecha_analisis, format="%d/%m/%Y")
+        except (ValueError, TypeError):
+            try:
+                return pd.to_datetime(fecha_analisis)
+            except (ValueError, TypeError):
+                return None
+    fecha_dt = pd.to_datetime(fecha_analisis)
+    return None if pd.isna(fecha_dt) else fecha_dt
+
+
 class VaRCalculator:
     """
     Calculadora integrada de VaR que obtiene datos de Supabase
     """
     
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, dtype=RESULT_DTYPE):
         """
         Inicializa el calculador con un cliente Supabase
         
         Args:
             supabase_client: Instancia de SupabaseClient
+            dtype: Tipo de los shocks guardados en cada VaRResult (float64 o float32)
         """
         self.supabase = supabase_client
+        self.dtype = np.dtype(dtype)
+    
+    def get_snapshot(self):
+        """Descarga posiciones y precios y construye el índice as-of"""
+        return MarketSnapshot.from_client(self.supabase)
     
-    def calculate_for_position(self, fecha_analisis, activo, confidence=0.95):
+    def calculate_for_position(self, fecha_analisis, activo, confidence=0.95, snapshot=None,
+                               max_staleness_days=None):
         """
         Calcula VaR para una posición específica
         
+        Usa la última posición y el último precio en o antes de la fecha de
+        análisis, siempre que no superen la antigüedad máxima configurada.
+        
         Args:
             fecha_analisis (str o datetime): Fecha de análisis (DD/MM/YYYY o datetime)
             activo (str): Código del activo (e.g. 'AAPL')
             confidence (float): Nivel de confianza (default 0.95)
+            snapshot (MarketSnapshot): Foto de datos ya cargada (si es None, se descarga)
+            max_staleness_days (int): Antigüedad máxima (si es None, la de la foto)
         
         Returns:
-            tuple: (resultado_dict, error_msg) - uno será None si no hay error
+            tuple: (VaRResult, error_msg) - uno será None si no hay error
         """
-        error = None
-        
-        # Obtener datos
-        df_positions = self.supabase.get_positions()
-        df_prices = self.supabase.get_prices()
+        if snapshot is None:
+            snapshot = self.get_snapshot()
         
-        if df_positions.empty or df_prices.empty:
+        if snapshot.empty:
             return None, "Error: No se pudieron obtener datos de Supabase"
         
-        # Convertir fechas
-        df_positions["Fecha"] = pd.to_datetime(df_positions["Fecha"], errors='coerce')
-        df_prices["Fecha"] = pd.to_datetime(df_prices["Fecha"], errors='coerce')
-        
         # Parsear fecha de análisis
-        if isinstance(fecha_analisis, str):
-            try:
-                fecha_dt = pd.to_datetime(fecha_analisis, format="%d/%m/%Y")
-            except:
-                try:
-                    fecha_dt = pd.to_datetime(fecha_analisis)
-                except:
-                    return None, "Formato de fecha inválido. Use DD/MM/YYYY o YYYY-MM-DD"
-        else:
-            fecha_dt = pd.to_datetime(fecha_analisis)
-        
-        # Obtener nominal del portafolio
-        port_activo = df_positions[
-            (df_positions["Fecha"] == fecha_dt) & 
-            (df_positions["Nemonico"] == activo)
-        ]
-        
-        if port_activo.empty:
-            activos_disp = df_positions[df_positions["Fecha"] == fecha_dt]["Nemonico"].unique().tolist()
+        fecha_dt = parse_fecha(fecha_analisis)
+        if fecha_dt is None:
+            return None, "Formato de fecha inválido. Use DD/MM/YYYY o YYYY-MM-DD"
+        
+        # Obtener nominal del portafolio (as-of)
+        posicion = snapshot.position_asof(activo, fecha_dt, max_staleness_days)
+        
+        if posicion is None:
+            activos_disp = snapshot.assets_on(fecha_dt, max_staleness_days)
             msg = f"No hay posición para {activo} en {fecha_dt.strftime('%d/%m/%Y')}"
             if activos_disp:
                 msg += f". Activos disponibles: {', '.join(activos_disp)}"
             return None, msg
         
-        nominal = port_activo["Nominal"].iloc[0]
+        fecha_posicion, nominal = posicion
         
         # Obtener precios históricos hasta la fecha (incluyendo la fecha de análisis)
-        df_precios_filt = df_prices[
-            (df_prices["Fecha"] <= fecha_dt) & 
-            (df_prices["Nemonico"] == activo)
-        ].copy()
-        df_precios_filt = df_precios_filt.sort_values("Fecha")
+        fechas_precios, prices = snapshot.price_history(activo, fecha_dt)
         
-        if df_precios_filt.empty or len(df_precios_filt) < 2:
+        if len(prices) < 2:
             return None, f"No hay suficientes precios históricos para {activo}"
         
-        # Obtener el precio base (precio en la fecha de análisis)
-        precio_en_fecha = df_precios_filt[df_precios_filt["Fecha"] == fecha_dt]
-        if precio_en_fecha.empty:
+        # Obtener el precio base (último precio en o antes de la fecha de análisis)
+        precio_base = snapshot.price_asof(activo, fecha_dt, max_staleness_days)
+        if precio_base is None:
             return None, f"No hay precio registrado para {activo} en {fecha_dt.strftime('%d/%m/%Y')}"
         
-        base_price_value = float(pd.to_numeric(precio_en_fecha["Precio"].iloc[0], errors='coerce'))
+        fecha_precio, base_price_value = precio_base
         
-        if pd.isna(base_price_value):
-            return None, f"Precio inválido para {activo} en {fecha_dt.strftime('%d/%m/%Y')}"
+        # Shocks históricos (sin saltos tipo split si la foto los descarta)
+        shocks = snapshot.shock_history(activo, fecha_dt)
+        if shocks.size == 0:
+            return None, f"No hay shocks válidos para {activo} (solo saltos tipo split)"
         
-        # Convertir precios a numérico
-        prices = pd.to_numeric(df_precios_filt["Precio"], errors='coerce').dropna().values
-        
-        if len(prices) < 2:
-            return None, "Precios inválidos o insuficientes"
-        
-        # Calcular VaR con el price base de la fecha especificada
+        # Calcular VaR con el precio base de la fecha especificada (solo shocks en memoria)
         try:
-            res = compute_historical_var(prices, nominal, confidence, base_price=base_price_value)
+            var, pct_value, tail_pct = var_from_shocks(shocks, nominal, base_price_value, confidence)
         except Exception as e:
             return None, f"Error en cálculo: {str(e)}"
         
-        # Envolver resultado con metadatos
-        resultado = {
-            "activo": activo,
-            "fecha": fecha_dt.strftime("%d/%m/%Y"),
-            "fecha_analisis": fecha_dt.strftime("%d/%m/%Y"),
-            "nominal": float(nominal),
-            "confidence": confidence,
-            "base_price": float(res["base_price"]),
-            "mtm_base": float(res["mtm_base"]),
-            "var": float(res["var"]),
-            "up": float(np.max(res["up"])),  # Máxima ganancia posible
-            "percentile_value": float(res["percentile_value"]),
-            "tail_pct": res["tail_pct"],
-            "num_precios": len(prices),
-            "num_shocks": len(res["shocks"]),
-            "fecha_min": df_precios_filt["Fecha"].min().strftime("%d/%m/%Y"),
-            "fecha_max": df_precios_filt["Fecha"].max().strftime("%d/%m/%Y"),
-            # Datos para tabla con nombres esperados por template
-            "simulaciones": pd.DataFrame({
-                "Shock": res["shocks"],
-                "Precio Simulado": res["simulated_prices"],
-                "P&L Simulado": res["up"]
-            })
-        }
+        # Envolver resultado con metadatos (solo se conservan los shocks)
+        resultado = VaRResult(
+            activo=activo,
+            fecha=fecha_dt.strftime("%d/%m/%Y"),
+            fecha_posicion=fecha_posicion.strftime("%d/%m/%Y"),
+            fecha_precio=fecha_precio.strftime("%d/%m/%Y"),
+            nominal=nominal,
+            confidence=confidence,
+            base_price=base_price_value,
+            var=var,
+            percentile_value=pct_value,
+            tail_pct=tail_pct,
+            num_precios=len(prices),
+            fecha_min=pd.Timestamp(fechas_precios[0]).strftime("%d/%m/%Y"),
+            fecha_max=pd.Timestamp(fechas_precios[-1]).strftime("%d/%m/%Y"),
+            shocks=shocks,
+            dtype=self.dtype
+        )
         
         return resultado, None
@@ -0,0 +1,133 @@
+"""
+Pruebas del cliente asíncrono (models.async_supabase_client) con httpx.MockTransport
+"""
+
+import asyncio
+import functools
+import os
+import httpx
+import pandas as pd
+import pytest
+from models import async_supabase_client as m
+from models.market_snapshot import MarketSnapshot
+
+ROWS = {
+    "RV.Positions": [{"Fecha": "2024-01-10", "Nemonico": "AAPL", "Nominal": 100}],
+    "RV.Price": [{"Fecha": f"2024-01-{d:02d}", "Nemonico": "AAPL", "Precio": 100 + d} for d in range(1, 11)],
+}
+
+
+class _Server:
+    """Handler de MockTransport que registra pedidos y concurrencia máxima"""
+
+    def __init__(self, delay=0.05, status=200):
+        self.delay = delay
+        self.status = status
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request):
+        self.requests.append(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if self.status != 200:
+            return httpx.Response(self.status, text="error")
+        return httpx.Response(200, json=ROWS[request.url.path.rsplit("/", 1)[1]])
+
+
+def _run(server, func):
+    async def main():
+        async with m.AsyncSupabaseClient("http://test/rest/v1", "k",
+                                         transport=httpx.MockTransport(server)) as client:
+            return await func(client)
+    return asyncio.run(main())
+
+
+def test_get_tables_en_paralelo():
+    server = _Server()
+
+    df_positions, df_prices = _run(server, lambda c: c.get_tables())
+
+    assert len(df_positions) == 1
+    assert len(df_prices) == 10
+    assert server.max_in_flight == 2
+
+
+def test_params_codificados_y_error_http():
+    server = _Server(status=500)
+
+    df = _run(server, lambda c: c.get_table_data("RV.Price", {"Nemonico": "eq.A&B"}))
+
+    assert df.empty
+    assert server.requests[0].url.params["Nemonico"] == "eq.A&B"
+
+
+def test_validate_connection_con_foto_solo_prueba_conexion():
+    server = _Server()
+    snapshot = MarketSnapshot(pd.DataFrame(ROWS["RV.Positions"]), pd.DataFrame(ROWS["RV.Price"]))
+
+    validation = _run(server, lambda c: c.validate_connection(snapshot))
+
+    assert validation["connected"] and validation["positions_ok"] and validation["prices_ok"]
+    assert validation["quality"]["rows_out"] == 10
+    assert len(server.requests) == 1
+    assert server.requests[0].url.params["limit"] == "1"
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    """Loop de fondo limpio y httpx.AsyncClient apuntando al servidor falso"""
+    server = _Server()
+    created = []
+
+    original = httpx.AsyncClient
+
+    def client_factory(**kwargs):
+        created.append(kwargs)
+        return original(**dict(kwargs, transport=httpx.MockTransport(server)))
+
+    monkeypatch.setattr(m, "_runner", None)
+    monkeypatch.setattr(m, "_clients", {})
+    monkeypatch.setattr(m.httpx, "AsyncClient", client_factory)
+    yield server, created
+    if m._runner is not None:
+        m._runner[1].call_soon_threadsafe(m._runner[1].stop)
+
+
+def test_fetch_tables_reutiliza_el_cliente(shared):
+    server, created = shared
+
+    m.fetch_tables()
+    df_positions, df_prices = m.fetch_tables()
+
+    assert len(df_prices) == 10
+    assert len(created) == 1
+    assert len(server.requests) == 4
+
+
+def test_run_with_client_dentro_de_un_loop_activo(shared):
+    async def main():
+        return m.fetch_tables()
+
+    df_positions, _ = asyncio.run(main())
+
+    assert len(df_positions) == 1
+
+
+def test_loop_de_fondo_se_recrea_tras_fork(shared, monkeypatch):
+    _, created = shared
+    m.fetch_tables()
+    loop = m._background_loop()
+
+    monkeypatch.setattr(os, "getpid", functools.partial(lambda pid: pid + 1, os.getpid()))
+    nuevo = m._background_loop()
+    m.fetch_tables()
+
+    assert nuevo is not loop
+    assert len(created) == 2
+    loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,111 @@
+"""
+Pruebas del cálculo de VaR por lotes (models.batch)
+"""
+
+import csv
+import json
+import pandas as pd
+import pytest
+from models import batch
+from models.var_calculator import VaRCalculator
+
+
+PEDIDOS = [
+    {"id": "a", "fecha": "15/01/2024", "activo": "AAPL", "confianza": 0.99},
+    {"fecha": "15/01/2024", "activo": "AAPL"},
+    {"fecha": 20240130, "activo": "AAPL"},
+    {"fecha": "15/01/2024", "activo": "AAPL", "confianza": "abc"},
+    {"fecha": "15/01/2024", "activo": "MSFT"},
+]
+
+
+def _write_jsonl(path, rows, extra=""):
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+        f.write(extra)
+
+
+def test_read_requests_por_bloques(tmp_path):
+    path = tmp_path / "pedidos.jsonl"
+    _write_jsonl(path, PEDIDOS, extra="\n{no es json\n[1]\n")
+
+    chunks = list(batch.read_requests(str(path), chunk_size=3))
+
+    assert [len(c) for c in chunks] == [3, 3, 1]
+    rows = [r for c in chunks for r in c]
+    assert rows[0]["id"] == "a"
+    assert rows[1]["id"] == "2"
+    assert rows[5]["error"] == "Línea JSON inválida"
+    assert rows[6]["error"] == "Pedido JSON inválido"
+
+
+def test_read_requests_csv_y_formato_no_soportado(tmp_path):
+    path = tmp_path / "pedidos.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["fecha", "activo"])
+        writer.writeheader()
+        writer.writerow({"fecha": "15/01/2024", "activo": "AAPL"})
+
+    rows = next(batch.read_requests(str(path)))
+    assert rows == [{"fecha": "15/01/2024", "activo": "AAPL", "id": "1"}]
+
+    with pytest.raises(ValueError):
+        next(batch.read_requests(str(tmp_path / "pedidos.txt")))
+
+
+@pytest.mark.parametrize("ext", [".jsonl", ".csv"])
+def test_run_batch(tmp_path, ext, snapshot):
+    entrada = tmp_path / "pedidos.jsonl"
+    _write_jsonl(entrada, PEDIDOS)
+    salida = tmp_path / f"resultados{ext}"
+    escenarios = tmp_path / f"escenarios{ext}"
+
+    summary = batch.run_batch(VaRCalculator(None), snapshot, str(entrada), str(salida),
+                              scenarios_path=str(escenarios), chunk_size=2)
+
+    assert summary == {"requests": 5, "ok": 2, "errors": 3}
+    if ext == ".csv":
+        rows = pd.read_csv(salida, dtype={"id": str, "fecha": str})
+    else:
+        rows = pd.read_json(salida, lines=True, dtype={"id": str, "fecha": str})
+    assert rows["ok"].tolist() == [True, True, False, False, False]
+    assert rows.loc[0, "confianza"] == 0.99
+    assert rows.loc[2, "fecha"] == "20240130"
+    assert rows.loc[2, "error"] == "fecha y activo son requeridos como texto"
+    assert rows.loc[3, "error"] == "Confianza inválida"
+    assert len(pd.read_csv(escenarios) if ext == ".csv" else pd.read_json(escenarios, lines=True)) == 2 * 10  # 11 precios hasta el 15/01
+
+
+def test_run_batch_parquet(tmp_path, snapshot):
+    pytest.importorskip("pyarrow")
+    entrada = tmp_path / "pedidos.jsonl"
+    _write_jsonl(entrada, PEDIDOS)
+    salida = tmp_path / "resultados.parquet"
+
+    summary = batch.run_batch(VaRCalculator(None), snapshot, str(entrada), str(salida), chunk_size=2)
+
+    rows = pd.read_parquet(salida)
+    assert summary["requests"] == len(rows) == 5
+    assert rows.loc[2, "fecha"] == "20240130"
+    assert not rows.loc[2, "ok"]
+
+
+@pytest.mark.parametrize("ext", [".jsonl", ".csv"])
+def test_confianza_cero_se_rechaza_en_ambos_formatos(tmp_path, ext, snapshot):
+    entrada = tmp_path / f"pedidos{ext}"
+    pedidos = [{"fecha": "15/01/2024", "activo": "AAPL", "confianza": 0},
+               {"fecha": "15/01/2024", "activo": "AAPL", "confianza": ""}]
+    if ext == ".csv":
+        pd.DataFrame(pedidos).to_csv(entrada, index=False)
+    else:
+        _write_jsonl(entrada, pedidos)
+    salida = tmp_path / "resultados.jsonl"
+
+    summary = batch.run_batch(VaRCalculator(None), snapshot, str(entrada), str(salida))
+
+    rows = pd.read_json(salida, lines=True)
+    assert summary["errors"] == 1
+    assert rows.loc[0, "error"] == "Confianza inválida"
+    assert rows.loc[1, "ok"]
+    assert rows.loc[1, "confianza"] == pytest.approx(0.95)
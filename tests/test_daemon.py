@@ -0,0 +1,85 @@
+"""
+Pruebas del cliente del worker (models.daemon.request)
+"""
+
+import os
+import socket
+import tempfile
+import threading
+import pytest
+from models import daemon
+
+pytestmark = pytest.mark.skipif(not daemon.available(), reason="Sin sockets Unix")
+
+
+def _server(reply):
+    """Servidor de una conexión que responde `reply` (bytes) o cierra sin responder"""
+    path = os.path.join(tempfile.mkdtemp(), "w.sock")
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    srv.bind(path)
+    srv.listen(1)
+
+    def run():
+        conn, _ = srv.accept()
+        with conn:
+            conn.recv(4096)
+            if reply is not None:
+                conn.sendall(reply)
+        srv.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    return path
+
+
+def test_respuesta_valida():
+    path = _server(b'{"ok": true}\n')
+
+    assert daemon.request({"op": "ping"}, path=path) == {"ok": True}
+
+
+@pytest.mark.parametrize("reply", [None, b"no es json\n", b"[1, 2]\n"])
+def test_fallos_del_worker_devuelven_none(reply):
+    path = _server(reply)
+
+    assert daemon.request({"op": "ping"}, path=path) is None
+
+
+def test_timeout_devuelve_none():
+    path = os.path.join(tempfile.mkdtemp(), "w.sock")
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    srv.bind(path)
+    srv.listen(1)
+    try:
+        assert daemon.request({"op": "ping"}, path=path, timeout=0.2) is None
+    finally:
+        srv.close()
+
+
+def test_sin_socket():
+    assert daemon.request({"op": "ping"}, path="/nonexistent/w.sock") is None
+
+
+def test_socket_de_otro_usuario_se_ignora(monkeypatch):
+    path = _server(b'{"ok": true}\n')
+    monkeypatch.setattr(os, "getuid", lambda: os.geteuid() + 1)
+
+    assert daemon.request({"op": "ping"}, path=path) is None
+
+
+def test_serve_no_borra_archivos_que_no_son_socket(tmp_path):
+    path = tmp_path / "keep.txt"
+    path.write_text("datos")
+
+    with pytest.raises(RuntimeError):
+        daemon.serve(str(path))
+    assert path.read_text() == "datos"
+
+
+def test_serve_no_sigue_enlaces(tmp_path):
+    path = _server(None)
+    link = tmp_path / "w.sock"
+    link.symlink_to(path)
+
+    with pytest.raises(RuntimeError):
+        daemon.serve(str(link))
+    assert os.path.exists(path)
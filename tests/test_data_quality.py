@@ -0,0 +1,66 @@
+"""
+Pruebas del control de calidad de precios (models.data_quality)
+"""
+
+import numpy as np
+import pandas as pd
+from models.data_quality import check_prices
+
+
+def _prices(nemonico, fechas, precios):
+    return pd.DataFrame({"Fecha": fechas, "Nemonico": nemonico, "Precio": precios})
+
+
+def test_descarta_invalidos_no_positivos_y_duplicados():
+    df = _prices("AAPL",
+                 ["2024-01-02", "2024-01-03", "2024-01-03", "2024-01-04", "malo", "2024-01-05"],
+                 [100, 0, 101, "abc", 102, 103])
+
+    clean, report = check_prices(df)
+
+    assert report["rows_in"] == 6
+    assert report["invalid"] == 2
+    assert report["non_positive"] == 1
+    assert report["duplicates"] == 0  # el precio 0 se descarta antes de deduplicar
+    assert clean["Precio"].tolist() == [100, 101, 103]
+    assert report["rows_out"] == 3
+
+
+def test_duplicado_conserva_ultimo_registro():
+    df = _prices("AAPL", ["2024-01-02", "2024-01-02", "2024-01-03"], [100, 105, 106])
+
+    clean, report = check_prices(df)
+
+    assert report["duplicates"] == 1
+    assert clean["Precio"].tolist() == [105, 106]
+
+
+def test_marca_split_sin_descartarlo():
+    fechas = pd.date_range("2024-01-01", periods=8).strftime("%Y-%m-%d")
+    df = _prices("X", fechas, [100, 101, 99, 100, 50.2, 50, 51, 50.5])
+
+    clean, report = check_prices(df)
+
+    assert report["splits"] == 1
+    assert report["samples"]["splits"][0]["fecha"] == "2024-01-05"
+    assert len(clean) == 8
+
+
+def test_huecos_se_cuentan_sin_rellenar():
+    fechas = pd.bdate_range("2024-01-01", periods=10).strftime("%Y-%m-%d")
+    a = _prices("A", fechas, np.linspace(100, 110, 10))
+    # B solo cotiza un día de cada dos
+    b = _prices("B", fechas[::2], np.linspace(50, 55, 5))
+
+    clean, report = check_prices(pd.concat([a, b], ignore_index=True))
+
+    assert report["gaps"] == 4
+    assert report["rows_out"] == len(clean) == 15
+    assert report["outliers"] == 0
+
+
+def test_tabla_vacia():
+    clean, report = check_prices(pd.DataFrame())
+
+    assert clean.empty
+    assert report["rows_in"] == 0
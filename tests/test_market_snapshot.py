@@ -0,0 +1,97 @@
+"""
+Pruebas de las consultas as-of de MarketSnapshot
+"""
+
+import pandas as pd
+import pytest
+from models.market_snapshot import MarketSnapshot
+
+
+def _snapshot(**kwargs):
+    positions = pd.DataFrame({
+        "Fecha": ["2024-01-05", "2024-01-10"],
+        "Nemonico": ["AAPL", "AAPL"],
+        "Nominal": [100, 200]
+    })
+    prices = pd.DataFrame({
+        "Fecha": ["2024-01-02", "2024-01-03", "2024-01-05", "2024-01-10"],
+        "Nemonico": ["AAPL"] * 4,
+        "Precio": [10.0, 11.0, 12.0, 13.0]
+    })
+    return MarketSnapshot(positions, prices, **kwargs)
+
+
+def test_position_asof_usa_ultima_posicion_vigente():
+    snapshot = _snapshot(max_staleness_days=5)
+
+    fecha, nominal = snapshot.position_asof("AAPL", "2024-01-08")
+
+    assert fecha == pd.Timestamp("2024-01-05")
+    assert nominal == 100
+    assert snapshot.position_asof("AAPL", "2024-01-04") is None
+
+
+def test_asof_respeta_antiguedad_maxima():
+    snapshot = _snapshot(max_staleness_days=2)
+
+    assert snapshot.price_asof("AAPL", "2024-01-08") is None
+    assert snapshot.price_asof("AAPL", "2024-01-08", max_staleness_days=3)[1] == 12.0
+
+
+def test_price_history_incluye_la_fecha():
+    snapshot = _snapshot()
+
+    fechas, precios = snapshot.price_history("AAPL", "2024-01-05")
+
+    assert precios.tolist() == [10.0, 11.0, 12.0]
+    assert snapshot.price_history("MSFT", "2024-01-05")[1].size == 0
+
+
+def test_activos_y_tablas():
+    snapshot = _snapshot()
+
+    assert snapshot.assets() == ["AAPL"]
+    assert snapshot.assets_on("2024-01-06") == ["AAPL"]
+    assert snapshot.prices_info["rows"] == 4
+    assert snapshot.quality_report["rows_out"] == 4
+
+
+def test_tablas_vacias():
+    snapshot = MarketSnapshot(pd.DataFrame(), pd.DataFrame())
+
+    assert snapshot.empty
+    assert snapshot.price_asof("AAPL", "2024-01-08") is None
+
+
+def _split_snapshot(**kwargs):
+    prices = pd.DataFrame({
+        "Fecha": pd.bdate_range("2024-01-01", periods=8).strftime("%Y-%m-%d"),
+        "Nemonico": "X",
+        "Precio": [100, 101, 99, 100, 50.2, 50, 51, 50.5]
+    })
+    positions = pd.DataFrame({"Fecha": ["2024-01-10"], "Nemonico": ["X"], "Nominal": [10]})
+    return MarketSnapshot(positions, prices, **kwargs)
+
+
+def test_shock_history_omite_splits():
+    shocks = _split_snapshot().shock_history("X", "2024-01-10")
+
+    assert len(shocks) == 6
+    assert shocks.min() > 0.9
+
+
+def test_shock_history_conserva_splits_si_se_pide():
+    shocks = _split_snapshot(drop_splits=False).shock_history("X", "2024-01-10")
+
+    assert len(shocks) == 7
+    assert shocks.min() == pytest.approx(0.502)
+
+
+def test_var_no_toma_el_split_como_perdida():
+    from models.var_calculator import VaRCalculator
+
+    res, error = VaRCalculator(None).calculate_for_position("10/01/2024", "X", snapshot=_split_snapshot())
+
+    assert error is None
+    assert res.num_shocks == 6
+    assert res.var < 0.05 * res.mtm_base
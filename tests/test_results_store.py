@@ -0,0 +1,86 @@
+"""
+Pruebas del almacenamiento de VaR precalculado (models.results_store)
+"""
+
+import pandas as pd
+import pytest
+from models import results_store
+from models.var_calculator import VaRCalculator
+
+
+@pytest.fixture
+def store(tmp_path):
+    return results_store.SQLiteResultsStore(str(tmp_path / "var.sqlite"))
+
+
+def test_precompute_guarda_resultados_y_errores(store, snapshot):
+    calculator = VaRCalculator(None)
+
+    summary = results_store.precompute(calculator, snapshot, store, hasta="2024-02-01", chunk_size=1)
+
+    assert summary["computed"] == 2
+    assert summary["errors"] == 1  # MSFT no tiene precios
+    assert store.computed_keys() == {("2024-01-10", "AAPL"), ("2024-01-26", "AAPL")}
+    assert store.get("2024-01-02", "MSFT")["Error"].startswith("No hay")
+
+    # La segunda ejecución no recalcula lo guardado pero reintenta el error
+    again = results_store.precompute(calculator, snapshot, store, hasta="2024-02-01")
+    assert again["computed"] == 0
+    assert again["errors"] == 1
+    assert again["skipped"] == 2
+
+
+def test_lookup_lee_precalculado_e_ignora_errores(store, snapshot):
+    calculator = VaRCalculator(None)
+    results_store.precompute(calculator, snapshot, store, hasta="2024-02-01")
+
+    live, _ = calculator.calculate_for_position("10/01/2024", "AAPL", 0.99, snapshot=snapshot)
+    stored = results_store.lookup(store, "10/01/2024", "AAPL", confidence=0.99)
+
+    assert stored.var == pytest.approx(live.var)
+    assert stored.confidence == 0.99
+    assert results_store.lookup(store, "02/01/2024", "MSFT") is None
+    assert results_store.lookup(store, "11/01/2024", "AAPL") is None
+    assert results_store.lookup(None, "10/01/2024", "AAPL") is None
+
+
+def test_backend_vacio_desactiva_resultados():
+    assert results_store.get_results_store("") is None
+    with pytest.raises(ValueError):
+        results_store.get_results_store("otro")
+
+
+class _PagedClient:
+    """Cliente falso que corta cada respuesta en max_rows filas"""
+
+    def __init__(self, rows, max_rows):
+        self.rows = rows
+        self.max_rows = max_rows
+        self.calls = []
+
+    def get_table_data(self, table_name, params=None, raise_errors=False):
+        self.calls.append(params)
+        if self.max_rows == 0:
+            if raise_errors:
+                raise RuntimeError("Error HTTP al leer RV.VaR: 500")
+            return pd.DataFrame()
+        offset = params.get("offset", 0)
+        return pd.DataFrame(self.rows[offset:offset + min(params["limit"], self.max_rows)])
+
+
+def test_computed_keys_pagina_todo():
+    rows = [{"Fecha": f"2024-01-{d:02d}", "Nemonico": f"A{i}"} for d in range(1, 29) for i in range(100)]
+    client = _PagedClient(rows, max_rows=1000)
+
+    keys = results_store.SupabaseResultsStore(client).computed_keys(page_size=1000)
+
+    assert len(keys) == 2800
+    assert len(client.calls) == 4
+    assert client.calls[0]["Error"] == "is.null"  # los errores guardados se reintentan
+
+
+def test_precompute_aborta_si_no_puede_leer_lo_calculado(store, snapshot):
+    supabase_store = results_store.SupabaseResultsStore(_PagedClient([], max_rows=0))
+
+    with pytest.raises(RuntimeError):
+        results_store.precompute(VaRCalculator(None), snapshot, supabase_store, hasta="2024-02-01")
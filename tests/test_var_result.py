@@ -0,0 +1,76 @@
+"""
+Pruebas de VaRResult y del cálculo de VaR desde shocks
+"""
+
+import numpy as np
+import pytest
+from models.var_calculator import VaRResult, compute_historical_var, var_from_shocks
+
+
+PRICES = np.array([100.0, 102.0, 99.0, 101.0, 97.0, 98.5, 103.0, 100.5, 101.5, 99.5])
+
+
+def _result(nominal=100, confidence=0.95, dtype=np.float64):
+    base = PRICES[-1]
+    shocks = PRICES[1:] / PRICES[:-1]
+    var, pct_value, tail_pct = var_from_shocks(shocks, nominal, base, confidence)
+    return VaRResult(
+        activo="AAPL", fecha="30/01/2024", fecha_posicion="29/01/2024", fecha_precio="30/01/2024",
+        nominal=nominal, confidence=confidence, base_price=base, var=var,
+        percentile_value=pct_value, tail_pct=tail_pct, num_precios=len(PRICES),
+        fecha_min="01/01/2024", fecha_max="30/01/2024", shocks=shocks, dtype=dtype
+    )
+
+
+@pytest.mark.parametrize("nominal", [100, -100])
+@pytest.mark.parametrize("confidence", [0.9, 0.95, 0.99])
+def test_var_from_shocks_equivale_a_simulacion_completa(nominal, confidence):
+    full = compute_historical_var(PRICES, nominal, confidence)
+    var, pct_value, _ = var_from_shocks(PRICES[1:] / PRICES[:-1], nominal, PRICES[-1], confidence)
+
+    assert var == pytest.approx(full["var"])
+    assert pct_value == pytest.approx(full["percentile_value"])
+
+
+@pytest.mark.parametrize("nominal", [100, -100])
+def test_up_es_maximo_pnl(nominal):
+    res = _result(nominal)
+
+    assert res.up == pytest.approx(np.max(res.pnl))
+
+
+def test_getitem_solo_expone_campos():
+    res = _result()
+
+    assert res["var"] == res.var
+    assert res["num_shocks"] == len(PRICES) - 1
+    with pytest.raises(KeyError):
+        res["to_dict"]
+    with pytest.raises(KeyError):
+        res["__slots__"]
+
+
+def test_set_confidence_recalcula_var():
+    res = _result(confidence=0.95)
+
+    res.set_confidence(0.99)
+
+    assert res.confidence == 0.99
+    assert res.var == pytest.approx(compute_historical_var(PRICES, 100, 0.99)["var"])
+
+
+def test_record_ida_y_vuelta():
+    res = _result(dtype=np.float32)
+
+    record = res.to_record()
+    assert record["Fecha"] == "2024-01-30"
+    assert record["FechaPosicion"] == "2024-01-29"
+
+    loaded = VaRResult.from_record(record)
+    assert loaded.fecha == res.fecha
+    assert loaded.var == pytest.approx(res.var)
+    np.testing.assert_allclose(loaded.shocks, res.shocks)
+
+    otra = VaRResult.from_record(record, confidence=0.99)
+    assert otra.confidence == 0.99
+    assert otra.var > res.var